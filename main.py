@@ -1,8 +1,69 @@
+from time import perf_counter
+START_TIME = perf_counter()     # Taken before the (slow) PyQt imports, used to report the startup time
+
+import argparse
+import os
+import sys
+
 from PyQt5.QtWidgets import QApplication
-from tool.tool import ConnectionTool
+
+import tool.Constants as const
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sain's connection checker")
+    parser.add_argument("--soak", type=int, metavar="CHECKS",
+                        help="Soak/leak test: run this many checks against local stand-in servers, then exit")
+    parser.add_argument("--targets", type=int, default=const.SOAK_TARGETS,
+                        help="Soak: number of stand-in servers to check")
+    parser.add_argument("--max-growth-mb", type=float, default=const.SOAK_MAX_RSS_GROWTH_MB,
+                        help="Soak: fail if memory grows more than this after the warm up")
+    parser.add_argument("--report", metavar="FILE",
+                        help="Soak/benchmark: write the measurements to this csv file")
+    parser.add_argument("--benchmark", nargs="?", const=const.BENCHMARK_SIZES, metavar="SIZES",
+                        help="Offscreen GUI benchmark for these numbers of servers (comma separated), then exit")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Record every check result to this file, for --replay")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Replay recorded results into the tool, no checks go out")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay: 1 = recorded pace, 10 = ten times faster, 0 = as fast as possible")
+    parser.add_argument("--exit-after-replay", action="store_true",
+                        help="Replay: close once everything got replayed")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.soak:
+        # No window needed, has to be set before the QApplication exists
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = QApplication([])
+
+        from tool.Soak import SoakRunner
+        sys.exit(SoakRunner(app, args.soak, args.targets,
+                            max_rss_growth_mb=args.max_growth_mb, report=args.report).run())
+
+    if args.benchmark:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = QApplication([])
+
+        from tool.Benchmark import GuiBenchmark
+        sizes = [int(size) for size in args.benchmark.split(",")]
+        sys.exit(GuiBenchmark(app, sizes, report=args.report).run())
+
+    if args.replay:
+        app = QApplication([])
+
+        from tool.Replay import run_replay
+        sys.exit(run_replay(app, args.replay, speed=args.speed, exit_when_done=args.exit_after_replay))
+
+    from tool.tool import ConnectionTool
+
     print("[?] - Starting ConnectionTool...")
     app = QApplication([])
-    tool = ConnectionTool()
+    tool = ConnectionTool(start_time=START_TIME)
+    if args.record:
+        tool.start_recording(args.record)
     app.exec_()
@@ -0,0 +1,240 @@
+"""
+Local stand-in servers for the probe tests, everything runs on 127.0.0.1
+Every server runs on a daemon thread and stops with its fixture
+"""
+
+import os
+import socket
+import ssl
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Self-signed certificate (and key) for localhost/127.0.0.1, valid until 2126
+CERTIFICATE = os.path.join(os.path.dirname(__file__), "data", "localhost.pem")
+
+
+class StandIn:
+    """
+    Runs loop(sock) on a thread until stop(), sock gets closed afterwards
+    """
+
+    def __init__(self, sock, loop=None):
+        self.sock = sock
+        self.port = sock.getsockname()[1]
+        self.stopped = threading.Event()
+        self.thread = None
+        if loop is not None:
+            sock.settimeout(0.1)
+            self.thread = threading.Thread(target=self.run, args=(loop,), daemon=True)
+            self.thread.start()
+
+    def run(self, loop):
+        while not self.stopped.is_set():
+            try:
+                loop(self.sock)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self.stopped.is_set():
+                    break
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.sock.close()
+
+
+def tcp_listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(128)
+    return sock
+
+
+def udp_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+@pytest.fixture
+def run_probes():
+    """
+    :return: callable(executor class, [Probe, ...], wait) -> {probe name: response}
+    Submits the probes to a fresh executor and waits for all of them to finish
+    """
+    executors = []
+
+    def run(executor_class, probes, wait=5.0, setup=None):
+        results = {}
+        finished = threading.Event()
+
+        def done(probe, response):
+            results[probe.name] = response
+            if len(results) == len(probes):
+                finished.set()
+
+        executor = executor_class(done)
+        executors.append(executor)
+        if setup is not None:
+            setup(executor)
+
+        for probe in probes:
+            executor.submit(probe)
+        assert finished.wait(wait), f"Only {len(results)} of {len(probes)} checks finished"
+        return results
+
+    yield run
+
+    for executor in executors:
+        executor.stop()
+
+
+@pytest.fixture
+def tcp_server():
+    """
+    Accepts connections and hangs up right away
+    """
+    def accept(sock):
+        conn, _ = sock.accept()
+        conn.close()
+
+    server = StandIn(tcp_listener(), accept)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def silent_tcp_server():
+    """
+    Listens, but never accepts or says anything. Connects go through (the backlog takes them)
+    """
+    server = StandIn(tcp_listener())
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def closed_port():
+    """
+    A free port nothing listens on, TCP and UDP
+    """
+    sock = tcp_listener()
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def udp_echo_server():
+    def echo(sock):
+        data, address = sock.recvfrom(65535)
+        sock.sendto(data, address)
+
+    server = StandIn(udp_socket(), echo)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def silent_udp_server():
+    """
+    Bound, but never answers
+    """
+    server = StandIn(udp_socket())
+    yield server
+    server.stop()
+
+
+def dns_reply(query):
+    """
+    Answers NXDOMAIN for names starting with "missing.", NOERROR (without records) for anything else
+    """
+    labels = []
+    offset = 12
+    while query[offset]:
+        length = query[offset]
+        labels.append(query[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+
+    rcode = 3 if labels and labels[0] == "missing" else 0
+    query_id, flags = struct.unpack("!HH", query[:4])
+    # QR + recursion available, keep the opcode and recursion desired of the query
+    flags = (flags | 0x8080) & 0xFFF0 | rcode
+    return struct.pack("!HH", query_id, flags) + query[4:]
+
+
+@pytest.fixture
+def dns_server():
+    def answer(sock):
+        data, address = sock.recvfrom(65535)
+        sock.sendto(dns_reply(data), address)
+
+    server = StandIn(udp_socket(), answer)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def tls_server():
+    """
+    Completes a TLS handshake with CERTIFICATE, then hangs up
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERTIFICATE)
+
+    def handshake(sock):
+        conn, _ = sock.accept()
+        conn.settimeout(2)
+        try:
+            with context.wrap_socket(conn, server_side=True):
+                pass
+        except (ssl.SSLError, OSError):
+            # The client gave up on our certificate, part of some tests
+            conn.close()
+
+    server = StandIn(tcp_listener(), handshake)
+    yield server
+    server.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    / - 200 with a small page, /close - the same but hangs up afterwards, anything else - 404
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path in ("/", "/close"):
+            status, body = 200, b"<html><body>status: UP</body></html>"
+        else:
+            status, body = 404, b"not here"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/close":
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.port = server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
@@ -0,0 +1,46 @@
+import pytest
+
+from tool.ContentCheck import RegexCheck, SubstringCheck
+
+
+def run_check(check, chunks):
+    """
+    :return: (passed, description), feeding chunks until the check has seen enough
+    """
+    for chunk in chunks:
+        if check.feed(chunk):
+            break
+    return check.finish(False)
+
+
+@pytest.mark.parametrize("pattern, chunks, passed", [
+    # Match spans the chunk boundary
+    (r"status: UP", [b"<p>status: ", b"UP</p>"], True),
+    (r"up(?=time)", [b"server up", b"time 5d"], True),
+    (r"(?<=status: )UP", [b"status: ", b"UP"], True),
+    # Would match on the first chunk alone, the next one says otherwise
+    (r"status\b", [b"<p>status", b"es: 3</p>"], False),
+    (r"UP$", [b"status: UP", b"GRADED"], False),
+    (r"UP(?!GRADED)", [b"status: UP", b"GRADED"], False),
+    # Only decided by the end of the body
+    (r"UP$", [b"status: ", b"UP"], True),
+    (r"status\b", [b"<p>status", b": UP</p>"], True),
+])
+def test_regex_chunk_split(pattern, chunks, passed):
+    assert run_check(RegexCheck(pattern), chunks)[0] is passed
+
+
+def test_regex_early_exit():
+    check = RegexCheck(r"status: (UP|OK)")
+
+    assert check.feed(b"<p>status: UP</p>") is True
+    assert check.finish(False) == (True, "content OK")
+
+
+def test_regex_not_matched():
+    assert run_check(RegexCheck(r"status: UP"), [b"status: ", b"DOWN"]) == (False, "regex not matched")
+
+
+def test_substring_chunk_split():
+    assert run_check(SubstringCheck("status: UP"), [b"<p>status:", b" UP</p>"])[0] is True
+    assert run_check(SubstringCheck("status: UP"), [b"<p>status:", b" DOWN</p>"])[0] is False
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt5.QtCore")
+from tool import Probes    # noqa: E402
+from tool.ConnectionChecker import ProbeDispatcher    # noqa: E402
+from tool.TimeoutPolicy import TimeoutPolicy    # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = ProbeDispatcher()
+    yield dispatcher
+    dispatcher.stop()
+
+
+def collect(app, dispatcher, probes, wait=5.0):
+    """
+    :return: {probe name: response}, once every probe answered through worker_response
+    """
+    results = {}
+    dispatcher.worker_response.connect(lambda response, name: results.__setitem__(name, response))
+    for probe in probes:
+        dispatcher.submit(probe)
+
+    deadline = time.perf_counter() + wait
+    while len(results) < len(probes):
+        assert time.perf_counter() < deadline, f"Only {len(results)} of {len(probes)} checks finished"
+        app.processEvents()
+        time.sleep(0.001)
+    return results
+
+
+def test_one_executor_per_type(app, dispatcher, tcp_server, udp_echo_server):
+    threads = threading.active_count()
+    probes = [Probes.Probe(f"tcp-{i}", "tcp", "127.0.0.1", tcp_server.port, 2) for i in range(100)]
+    probes += [Probes.Probe(f"udp-{i}", "udp", "127.0.0.1", udp_echo_server.port, 2) for i in range(100)]
+
+    results = collect(app, dispatcher, probes)
+
+    assert {results[f"tcp-{i}"]['status'] for i in range(100)} == {"Online"}
+    assert {results[f"udp-{i}"]['status'] for i in range(100)} == {"Echo OK"}
+    # Batched, one loop thread per type and not one thread per check
+    assert set(dispatcher.executors) == {"tcp", "udp"}
+    assert threading.active_count() - threads == 2
+
+
+def test_timeout_retried_once(app, dispatcher, silent_tcp_server):
+    probe = Probes.Probe("tls", "tls", "127.0.0.1", silent_tcp_server.port, 0.1, retry_timeout=0.3)
+
+    started = time.perf_counter()
+    results = collect(app, dispatcher, [probe])
+
+    assert results["tls"]['status'] == Probes.TIMED_OUT
+    assert results["tls"]['retried'] is True
+    # First try plus the retry with its longer timeout
+    assert time.perf_counter() - started >= 0.4
+
+
+def test_time_to_down(app, dispatcher, silent_tcp_server):
+    # A server answering in 50ms goes silent, first try and retry together stay below the maximum
+    policy = TimeoutPolicy(minimum=0.1, maximum=1.0, factor=3)
+    for _ in range(10):
+        policy.record("tls", 0.05)
+    timeout = policy.timeout_for("tls")
+    probe = Probes.Probe("tls", "tls", "127.0.0.1", silent_tcp_server.port, timeout,
+                         retry_timeout=policy.retry_timeout(timeout))
+
+    started = time.perf_counter()
+    results = collect(app, dispatcher, [probe])
+    elapsed = time.perf_counter() - started
+
+    assert results["tls"]['status'] == Probes.TIMED_OUT
+    assert results["tls"]['retried'] is True
+    assert 0.45 <= elapsed < policy.maximum
+
+
+def test_timeout_without_retry(app, dispatcher, silent_tcp_server):
+    probe = Probes.Probe("tls", "tls", "127.0.0.1", silent_tcp_server.port, 0.1)
+
+    results = collect(app, dispatcher, [probe])
+
+    assert results["tls"]['status'] == Probes.TIMED_OUT
+    assert 'retried' not in results["tls"]
+
+
+def test_no_retry_when_down(app, dispatcher, closed_port):
+    probe = Probes.Probe("closed", "tcp", "127.0.0.1", closed_port, 0.1, retry_timeout=0.3)
+
+    results = collect(app, dispatcher, [probe])
+
+    assert results["closed"]['status'] == "Refused"
+    assert 'retried' not in results["closed"]
@@ -0,0 +1,88 @@
+import pickle
+
+import pytest
+
+from tool.History import DownsampleCache, MinMaxBuckets, ProbeHistory, Series
+
+WEEK = 7 * 24 * 3600
+NOW = 1_800_000_000.0
+
+
+@pytest.fixture
+def history():
+    """
+    A week of checks every 30 seconds, latency going up over the day, down every 1000th check
+    """
+    history = ProbeHistory(window=WEEK, resolution=300)
+    for i in range(WEEK // 30):
+        timestamp = NOW - WEEK + i * 30
+        history.record("web", timestamp, None if i % 1000 == 0 else (timestamp % 86400) / 86400)
+    return history
+
+
+def test_series_size_bounded(history):
+    series = history.get("web")
+
+    assert series.total == WEEK // 30
+    assert len(series.lows) == series.capacity == WEEK // 300
+    # Pre-aggregated, not a sample per check
+    assert len(pickle.dumps(series)) < 20 * 1024
+
+
+def test_buckets_match_checks():
+    series = Series(10, 6)
+    series.append(0, 0.5)
+    series.append(5, 0.2)
+    series.append(12, None)
+    series.append(25, 0.7)
+
+    first, lows, highs, downs = series.ordered()
+    assert first == -3
+    assert list(lows[3:]) == pytest.approx([0.2, float('inf'), 0.7])
+    assert list(highs[3:]) == pytest.approx([0.5, float('-inf'), 0.7])
+    assert list(downs) == [0, 0, 0, 0, 1, 0]
+
+
+def test_old_buckets_cleared():
+    series = Series(10, 3)
+    series.append(0, 0.5)
+    series.append(10, None)
+    # Nothing for a while, the slots from back then can't show up again
+    series.append(100, 0.1)
+
+    _, lows, _, downs = series.ordered()
+    assert list(lows) == pytest.approx([float('inf'), float('inf'), 0.1])
+    assert list(downs) == [0, 0, 0]
+
+
+@pytest.mark.parametrize("width", [100, 2016, 5000])
+def test_columns(history, width):
+    view = MinMaxBuckets(history.get("web"), width, WEEK)
+    columns = view.columns(NOW)
+
+    # The newest column starts at NOW, no checks in it yet
+    assert [column for column, _, _, _ in columns] == list(range(width - 1))
+    assert all(low <= high for _, low, high, _ in columns)
+    # Every down check shows up, whatever the width
+    downs = sum(down for _, _, _, down in columns)
+    assert downs >= (WEEK // 30) // 1000
+    assert min(low for _, low, _, _ in columns) == pytest.approx(0, abs=0.01)
+    assert max(high for _, _, high, _ in columns) == pytest.approx(1, abs=0.01)
+
+
+def test_cache_follows_width_and_new_checks(history):
+    cache = DownsampleCache(history, window=WEEK)
+
+    assert cache.columns("web", 300, NOW)[-1][0] <= 299
+    assert cache.columns("web", 301, NOW)[-1][0] == 300
+
+    history.record("web", NOW + 1, 5.0)
+    assert cache.columns("web", 301, NOW + 1)[-1][2] == 5.0
+    assert cache.columns("missing", 301, NOW) == []
+
+
+def test_restore_skips_other_formats(history):
+    restored = ProbeHistory(window=WEEK, resolution=300)
+    restored.restore({"web": history.get("web"), "old": object(), "finer": Series(60, WEEK // 60)})
+
+    assert set(restored.series) == {"web"}
@@ -0,0 +1,52 @@
+import pytest
+
+from tool.Probes import Probe
+from tool.Probes.Dns import DnsExecutor, parse_target, RECORD_TYPES
+
+
+def test_answer(run_probes, dns_server):
+    results = run_probes(DnsExecutor, [Probe("dns", "dns", "127.0.0.1/example.com/AAAA", dns_server.port, 2)])
+
+    assert results["dns"]['status'] == "DNS NOERROR"
+    assert results["dns"]['up'] is True
+    assert results["dns"]['latency'] is not None
+
+
+def test_nxdomain(run_probes, dns_server):
+    results = run_probes(DnsExecutor, [Probe("dns", "dns", "127.0.0.1/missing.example", dns_server.port, 2)])
+
+    assert results["dns"]['status'] == "DNS NXDOMAIN"
+    assert results["dns"]['up'] is False
+
+
+def test_timeout(run_probes, silent_udp_server):
+    results = run_probes(DnsExecutor, [Probe("dns", "dns", "127.0.0.1/example.com", silent_udp_server.port, 0.2)])
+
+    assert results["dns"]['status'] == "Timed out"
+    assert results["dns"]['up'] is False
+
+
+def test_many_queries_share_one_socket(run_probes, dns_server):
+    probes = [Probe(f"ok-{i}", "dns", f"127.0.0.1/n{i}.example", dns_server.port, 2) for i in range(100)]
+    probes += [Probe(f"missing-{i}", "dns", "127.0.0.1/missing.example", dns_server.port, 2) for i in range(100)]
+    sockets = {}
+
+    results = run_probes(DnsExecutor, probes, setup=lambda executor: sockets.update(shared=executor.sockets))
+
+    assert {results[f"ok-{i}"]['status'] for i in range(100)} == {"DNS NOERROR"}
+    assert {results[f"missing-{i}"]['status'] for i in range(100)} == {"DNS NXDOMAIN"}
+    assert len(sockets["shared"]) == 1
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("8.8.8.8", ("8.8.8.8", ".", RECORD_TYPES["NS"])),
+    ("8.8.8.8/example.com", ("8.8.8.8", "example.com", RECORD_TYPES["A"])),
+    ("8.8.8.8/example.com/mx", ("8.8.8.8", "example.com", RECORD_TYPES["MX"])),
+])
+def test_parse_target(url, expected):
+    assert parse_target(url) == expected
+
+
+def test_validate():
+    assert DnsExecutor.validate("8.8.8.8/example.com/AAAA") is None
+    assert "Unknown record type" in DnsExecutor.validate("8.8.8.8/example.com/BOGUS")
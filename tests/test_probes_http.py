@@ -0,0 +1,48 @@
+import pytest
+
+from tool.Probes import Probe
+
+pytest.importorskip("requests")
+from tool.Probes.Http import HttpExecutor    # noqa: E402
+
+
+def test_ok(run_probes, http_server):
+    results = run_probes(HttpExecutor, [Probe("web", "http", "127.0.0.1", http_server.port, 2)])
+
+    assert results["web"]['status'] == "[200] - OK"
+    assert results["web"]['up'] is True
+    assert results["web"]['is_web'] is True
+    assert results["web"]['ipv4/6'] == "127.0.0.1"
+
+
+def test_server_closes_connection(run_probes, http_server):
+    results = run_probes(HttpExecutor, [Probe("web", "http", "127.0.0.1/close", http_server.port, 2)])
+
+    assert results["web"]['status'] == "[200] - OK"
+    assert results["web"]['up'] is True
+
+
+def test_not_found(run_probes, http_server):
+    results = run_probes(HttpExecutor, [Probe("web", "http", "http://127.0.0.1/gone", http_server.port, 2)])
+
+    assert results["web"]['status'] == "[404] - Not Found"
+    assert results["web"]['up'] is False
+
+
+def test_offline(run_probes, closed_port):
+    results = run_probes(HttpExecutor, [Probe("web", "http", "127.0.0.1", closed_port, 2)])
+
+    assert results["web"]['status'] == "OFFLINE"
+    assert results["web"]['up'] is False
+
+
+@pytest.mark.parametrize("check, status, up", [
+    ({'type': "substring", 'value': "status: UP"}, "[200] - OK | content OK", True),
+    ({'type': "regex", 'value': r"status: (UP|DOWN)"}, "[200] - OK | content OK", True),
+    ({'type': "substring", 'value': "status: DOWN"}, "[200] - OK | text not found", False),
+])
+def test_content_check(run_probes, http_server, check, status, up):
+    results = run_probes(HttpExecutor, [Probe("web", "http", "127.0.0.1", http_server.port, 2, content_check=check)])
+
+    assert results["web"]['status'] == status
+    assert results["web"]['up'] is up
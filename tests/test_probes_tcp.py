@@ -0,0 +1,59 @@
+from tool.Probes import Probe
+from tool.Probes.Tcp import TcpExecutor
+
+
+def test_online(run_probes, tcp_server):
+    results = run_probes(TcpExecutor, [Probe("up", "tcp", "127.0.0.1", tcp_server.port, 2)])
+
+    response = results["up"]
+    assert response['status'] == "Online"
+    assert response['up'] is True
+    assert response['ipv4/6'] == "IPv4"
+    assert response['latency'] is not None
+
+
+def test_refused(run_probes, closed_port):
+    results = run_probes(TcpExecutor, [Probe("closed", "tcp", "127.0.0.1", closed_port, 2)])
+
+    assert results["closed"]['status'] == "Refused"
+    assert results["closed"]['up'] is False
+    assert results["closed"]['latency'] is None
+
+
+def test_offline(run_probes):
+    # .invalid never resolves (RFC 2606)
+    results = run_probes(TcpExecutor, [Probe("gone", "tcp", "nonexistent.invalid", 80, 2)])
+
+    assert results["gone"]['status'] == "Offline"
+    assert results["gone"]['up'] is False
+
+
+def test_hostname_and_many_at_once(run_probes, tcp_server, closed_port):
+    probes = [Probe(f"up-{i}", "tcp", "localhost", tcp_server.port, 2) for i in range(50)]
+    probes += [Probe(f"closed-{i}", "tcp", "127.0.0.1", closed_port, 2) for i in range(50)]
+
+    results = run_probes(TcpExecutor, probes)
+
+    assert {results[f"up-{i}"]['status'] for i in range(50)} == {"Online"}
+    assert {results[f"closed-{i}"]['status'] for i in range(50)} == {"Refused"}
+
+
+def test_loop_survives_callback_exception(run_probes, tcp_server):
+    def setup(executor):
+        begin = executor.begin
+
+        def failing_begin(probe, addresses, error):
+            if probe.name == "broken":
+                raise RuntimeError("broken callback")
+            begin(probe, addresses, error)
+
+        executor.begin = failing_begin
+
+    probes = [Probe("broken", "tcp", "127.0.0.1", tcp_server.port, 2),
+              Probe("up", "tcp", "127.0.0.1", tcp_server.port, 2)]
+    results = run_probes(TcpExecutor, probes, setup=setup)
+
+    assert results["broken"]['status'] == "Unknown exception"
+    assert results["broken"]['up'] is False
+    # Same loop thread, still going
+    assert results["up"]['status'] == "Online"
@@ -0,0 +1,45 @@
+import ssl
+
+import tool.Constants as const
+from tool.Probes import Probe
+from tool.Probes.Tls import TlsExecutor
+
+from conftest import CERTIFICATE
+
+
+def trust_stand_in(executor):
+    executor.context = ssl.create_default_context(cafile=CERTIFICATE)
+
+
+def test_handshake(run_probes, tls_server):
+    results = run_probes(TlsExecutor, [Probe("tls", "tls", "127.0.0.1", tls_server.port, 2)],
+                         setup=trust_stand_in)
+
+    assert results["tls"]['status'].startswith("TLS OK - TLSv1.")
+    assert results["tls"]['up'] is True
+    assert results["tls"]['latency'] is not None
+
+
+def test_expires_soon(run_probes, tls_server, monkeypatch):
+    monkeypatch.setattr(const, "TLS_EXPIRY_WARN_DAYS", 365 * 1000)
+
+    results = run_probes(TlsExecutor, [Probe("tls", "tls", "127.0.0.1", tls_server.port, 2)],
+                         setup=trust_stand_in)
+
+    assert results["tls"]['status'].startswith("TLS OK, certificate expires soon")
+    assert results["tls"]['up'] is True
+
+
+def test_untrusted_certificate(run_probes, tls_server):
+    results = run_probes(TlsExecutor, [Probe("tls", "tls", "127.0.0.1", tls_server.port, 2)])
+
+    assert results["tls"]['status'].startswith("Certificate error")
+    assert results["tls"]['up'] is False
+
+
+def test_timeout(run_probes, silent_tcp_server):
+    # The connect goes through, the handshake never gets an answer
+    results = run_probes(TlsExecutor, [Probe("tls", "tls", "127.0.0.1", silent_tcp_server.port, 0.2)])
+
+    assert results["tls"]['status'] == "Timed out"
+    assert results["tls"]['up'] is False
@@ -0,0 +1,25 @@
+from tool.Probes import Probe
+from tool.Probes.Udp import UdpExecutor
+
+
+def test_echo(run_probes, udp_echo_server):
+    results = run_probes(UdpExecutor, [Probe("echo", "udp", "127.0.0.1", udp_echo_server.port, 2)])
+
+    assert results["echo"]['status'] == "Echo OK"
+    assert results["echo"]['up'] is True
+    assert results["echo"]['latency'] is not None
+
+
+def test_refused(run_probes, closed_port):
+    # Nothing listening, the ICMP port unreachable comes back as refused
+    results = run_probes(UdpExecutor, [Probe("closed", "udp", "127.0.0.1", closed_port, 2)])
+
+    assert results["closed"]['status'] == "Refused"
+    assert results["closed"]['up'] is False
+
+
+def test_timeout(run_probes, silent_udp_server):
+    results = run_probes(UdpExecutor, [Probe("silent", "udp", "127.0.0.1", silent_udp_server.port, 0.2)])
+
+    assert results["silent"]['status'] == "Timed out"
+    assert results["silent"]['up'] is False
@@ -0,0 +1,85 @@
+import json
+import socket
+import time
+
+import pytest
+
+import tool.Constants as const
+from tool.PushApi import PushServer
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(const, "PUSH_INBOX_SIZE", 10)
+    monkeypatch.setattr(const, "PUSH_BATCH_INTERVAL", 0.2)
+    server = PushServer(0)
+    yield server
+    server.stop()
+
+
+def request(server, path):
+    sock = socket.create_connection(("127.0.0.1", server.port), timeout=2)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    return sock
+
+
+def read_events(sock, until, wait=3.0):
+    """
+    :return: [event, ...] from a /stream connection, up to and including the first one of type until
+    """
+    events = []
+    data = b""
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        data += sock.recv(65536)
+        *lines, data = data.split(b"\n")
+        for line in lines:
+            if line.startswith(b"{"):
+                events.append(json.loads(line))
+                if events[-1]['type'] == until:
+                    return events
+    raise AssertionError(f"No {until} event, got {[event['type'] for event in events]}")
+
+
+def get_status(server):
+    sock = request(server, "/status")
+    data = b""
+    while chunk := sock.recv(65536):
+        data += chunk
+    sock.close()
+    return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+
+def test_status_changes(server):
+    stream = request(server, "/stream")
+    read_events(stream, "snapshot")
+
+    server.publish("web", {'status': "Online", 'up': True, 'latency': 0.01})
+    server.publish("web", {'status': "Online", 'up': True, 'latency': 0.02})
+    server.publish("web", {'status': "Refused", 'up': False, 'latency': None})
+
+    events = [event for event in read_events(stream, "latency") if event['type'] != "heartbeat"]
+    assert [(event['type'], event.get('status')) for event in events] == [
+        ("status", "Online"), ("status", "Refused"), ("latency", None)]
+    assert len(events[-1]['samples']) == 3
+    stream.close()
+
+
+def test_inbox_overflow(server, monkeypatch):
+    stream = request(server, "/stream")
+    read_events(stream, "snapshot")
+
+    # No wakeups, everything piles up until the next batch
+    monkeypatch.setattr(server, "wake", lambda: None)
+    for i in range(50):
+        server.publish(f"server-{i % 5}", {'status': f"status {i}", 'up': i % 2 == 0, 'latency': 0.01})
+    server.remove("server-0")
+
+    events = read_events(stream, "dropped")
+    assert events[-1]['count'] == 51 - 10
+    stream.close()
+
+    # Caught up with the latest result per server, nothing lost
+    servers = get_status(server)['servers']
+    assert {name: status['status'] for name, status in servers.items()} == {
+        "server-1": "status 46", "server-2": "status 47", "server-3": "status 48", "server-4": "status 49"}
@@ -0,0 +1,32 @@
+import pytest
+
+from tool.TimeoutPolicy import TimeoutPolicy
+
+
+@pytest.fixture
+def policy():
+    return TimeoutPolicy(minimum=0.5, maximum=10, factor=3)
+
+
+def test_timeout_from_latencies(policy):
+    for _ in range(10):
+        policy.record("fast", 0.2)
+
+    assert policy.timeout_for("fast") == pytest.approx(0.6)
+    assert policy.timeout_for("new") == 10
+
+
+@pytest.mark.parametrize("timeout", [0.5, 2, 3.5, 6, 9])
+def test_retry_stays_within_maximum(policy, timeout):
+    retry = policy.retry_timeout(timeout)
+
+    assert retry is None or timeout + retry <= policy.maximum
+
+
+def test_retry_timeout(policy):
+    # Twice the first try, unless that would go past the maximum
+    assert policy.retry_timeout(0.6) == pytest.approx(1.2)
+    assert policy.retry_timeout(6) == pytest.approx(4)
+    # No samples (maximum timeout) or too little room left, no retry
+    assert policy.retry_timeout(10) is None
+    assert policy.retry_timeout(9.8) is None
@@ -0,0 +1,218 @@
+"""
+Streaming uptime and latency percentile aggregates per server
+Nothing here ever walks the raw history, every check updates a handful of counters:
+
+- Latencies go into a log-bucketed histogram (HDR histogram style), bin edges grow by
+  LATENCY_BIN_GROWTH so every percentile is within a few percent of the real value
+- Each window (1h, 24h, 30d) is a ring of time buckets with up/down counters and a sparse histogram,
+  plus running totals. Buckets that fall out of the window get subtracted from the totals
+
+record() is O(1) (amortized, a bucket gets evicted once), so is uptimes().
+Percentiles are O(bins), they are cached per window until its histogram changes
+and the tool only asks for them when it redraws the latency column (see LATENCY_REFRESH)
+"""
+
+from array import array
+from collections import deque
+import math
+
+import tool.Constants as const
+
+# Histogram layout, bin 0 holds everything below LATENCY_MIN
+_LOG_GROWTH = math.log(const.LATENCY_BIN_GROWTH)
+LATENCY_BINS = int(math.log(const.LATENCY_MAX / const.LATENCY_MIN) / _LOG_GROWTH) + 2
+
+# (column title, window length in seconds, number of time buckets)
+WINDOWS = (
+    ("1h", 3600, 60),
+    ("24h", 24 * 3600, 96),
+    ("30d", 30 * 24 * 3600, 30),
+)
+
+
+def latency_bin(latency):
+    """
+    :param latency: float - seconds
+    :return: int - histogram bin
+    """
+    if latency < const.LATENCY_MIN:
+        return 0
+    return min(LATENCY_BINS - 1, int(math.log(latency / const.LATENCY_MIN) / _LOG_GROWTH) + 1)
+
+
+def bin_value(index):
+    """
+    :param index: int - histogram bin
+    :return: float - seconds, the middle of the bin (geometric)
+    """
+    if index == 0:
+        return const.LATENCY_MIN
+    return const.LATENCY_MIN * const.LATENCY_BIN_GROWTH ** (index - 0.5)
+
+
+class WindowAggregate:
+    """
+    Up/down counts and a latency histogram over a sliding window
+    """
+
+    def __init__(self, length, bucket_count):
+        """
+        :param length: float - window length, seconds
+        :param bucket_count: int - time buckets in the window, sets how smoothly it slides
+        """
+        self.length = length
+        self.span = length / bucket_count
+        self.bucket_count = bucket_count
+
+        # deque of [bucket number, up, down, {bin: count}], oldest first
+        self.buckets = deque()
+
+        # Running totals over all buckets in self.buckets
+        self.up = 0
+        self.down = 0
+        self.latencies = 0
+        self.histogram = array('l', [0]) * LATENCY_BINS
+
+        # Last percentiles() result, (wanted, result), None once the histogram changed
+        self.cached = None
+
+    def expire(self, now):
+        """
+        Subtracts buckets that fell out of the window from the totals
+        :param now: float - time.time()
+        """
+        oldest = int(now // self.span) - self.bucket_count + 1
+        while self.buckets and self.buckets[0][0] < oldest:
+            _, up, down, bins = self.buckets.popleft()
+            self.up -= up
+            self.down -= down
+            for index, count in bins.items():
+                self.histogram[index] -= count
+                self.latencies -= count
+            if bins:
+                self.cached = None
+
+    def record(self, timestamp, latency, up):
+        """
+        :param timestamp: float - time.time() of the check
+        :param latency: float or None - seconds
+        :param up: bool
+        """
+        number = int(timestamp // self.span)
+        # Clock went backwards, count it in the newest bucket to keep them in order
+        if self.buckets and number < self.buckets[-1][0]:
+            number = self.buckets[-1][0]
+
+        if not self.buckets or self.buckets[-1][0] != number:
+            self.buckets.append([number, 0, 0, {}])
+            self.expire(timestamp)
+        bucket = self.buckets[-1]
+
+        if up:
+            bucket[1] += 1
+            self.up += 1
+        else:
+            bucket[2] += 1
+            self.down += 1
+
+        if latency is not None:
+            index = latency_bin(latency)
+            bucket[3][index] = bucket[3].get(index, 0) + 1
+            self.histogram[index] += 1
+            self.latencies += 1
+            self.cached = None
+
+    def uptime(self):
+        """
+        :return: float or None - percentage of up checks, None without any checks
+        """
+        checks = self.up + self.down
+        return None if checks == 0 else self.up / checks * 100
+
+    def percentiles(self, wanted):
+        """
+        :param wanted: tuple - percentiles (0-100) to look up, ascending
+        :return: list - latency in seconds per requested percentile, None without any latencies
+        """
+        count = self.latencies
+        if count == 0:
+            return [None] * len(wanted)
+        if self.cached is not None and self.cached[0] == wanted:
+            return list(self.cached[1])
+
+        result = []
+        targets = iter(wanted)
+        target = next(targets)
+        seen = 0
+        for index, bin_count in enumerate(self.histogram):
+            seen += bin_count
+            while target is not None and seen >= math.ceil(target / 100 * count):
+                result.append(bin_value(index))
+                target = next(targets, None)
+            if target is None:
+                break
+
+        self.cached = (wanted, result)
+        return list(result)
+
+
+class ServerAggregates:
+    """
+    All windows for a single server
+    """
+
+    def __init__(self):
+        # {title: WindowAggregate}
+        self.windows = {title: WindowAggregate(length, buckets) for title, length, buckets in WINDOWS}
+
+    def record(self, timestamp, latency, up):
+        for window in self.windows.values():
+            window.record(timestamp, latency, up)
+
+    def uptimes(self, now):
+        """
+        :param now: float - time.time()
+        :return: dict - {title: uptime percentage or None}, O(1)
+        """
+        result = {}
+        for title, window in self.windows.items():
+            window.expire(now)
+            result[title] = window.uptime()
+        return result
+
+    def latency(self, title, now, percentiles=const.LATENCY_PERCENTILES):
+        """
+        :param title: str - window, e.g. const.LATENCY_WINDOW
+        :param now: float - time.time()
+        :param percentiles: tuple
+        :return: list - see WindowAggregate.percentiles()
+        """
+        window = self.windows[title]
+        window.expire(now)
+        return window.percentiles(percentiles)
+
+    def summary(self, now, percentiles=const.LATENCY_PERCENTILES):
+        """
+        :param now: float - time.time()
+        :param percentiles: tuple - percentiles to return per window
+        :return: dict - {title: {'checks': int, 'uptime': float, 'latency': [float, ...]}}
+        """
+        result = {}
+        for title, window in self.windows.items():
+            window.expire(now)
+            result[title] = {
+                'checks': window.up + window.down,
+                'uptime': window.uptime(),
+                'latency': window.percentiles(percentiles),
+            }
+        return result
+
+
+def format_uptime(uptime):
+    return "-" if uptime is None else f"{uptime:.2f}%"
+
+
+def format_latencies(latencies):
+    if latencies[0] is None:
+        return "-"
+    return "/".join(f"{latency * 1000:.0f}" for latency in latencies) + " ms"
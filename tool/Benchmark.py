@@ -0,0 +1,259 @@
+"""
+GUI throughput benchmark, runs under Qt's offscreen platform (no display needed)
+For every size (number of servers) a fresh ConnectionTool goes through:
+
+- load_servers: reading and showing a server list of that size
+- server_response: BENCHMARK_ROUNDS synthetic results per server, BENCHMARK_FLIP of them flipping
+  status every round, fed in batches of BENCHMARK_BATCH with the event loop running in between
+- apply_search: filtering both tables down to one group and clearing the filter again,
+  counted per row that got hidden or shown
+- server_delete_clicked: deleting BENCHMARK_DELETE of the servers, spread over the table
+
+Per phase it reports results per second, the longest GUI thread stall (biggest gap between
+two ticks of a 1ms heartbeat timer) and the resident memory afterwards.
+Nothing goes out over the network.
+
+Usage: py main.py --benchmark 1000,10000,50000 --report bench.csv
+"""
+
+import csv
+import logging
+import pickle
+import random
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QItemSelection, QItemSelectionModel
+
+import tool.Constants as const
+from tool import ConfigHandler
+from tool.Soak import get_rss
+
+
+class StallMeter(QObject):
+    """
+    Ticks every millisecond on the GUI thread, the biggest gap between two ticks
+    is the longest the GUI thread was busy without handling events
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.timer = QTimer(self)
+        self.timer.setInterval(1)
+        self.timer.timeout.connect(self.tick)
+
+        self.last = None
+        self.max_gap = 0.0
+
+    def start(self):
+        self.reset()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def reset(self):
+        self.last = time.perf_counter()
+        self.max_gap = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        self.max_gap = max(self.max_gap, now - self.last)
+        self.last = now
+
+    def result(self):
+        """
+        :return: float - longest stall since the reset, also counts the time since the last tick
+        """
+        return max(self.max_gap, time.perf_counter() - self.last)
+
+
+class GuiBenchmark:
+    """
+    Runs the phases for every size and keeps the measurements
+    """
+
+    def __init__(self, app, sizes, rounds=const.BENCHMARK_ROUNDS, report=None, seed=0):
+        """
+        :param app: QApplication
+        :param sizes: list - number of servers per run, e.g. [1000, 10000, 50000]
+        :param rounds: int - results per server in the server_response phase
+        :param report: str - Optional csv file, one line per size and phase
+        :param seed: int - the synthetic servers and results are the same every run
+        """
+        self.logger = logging.getLogger("tool.Benchmark")
+
+        self.app = app
+        self.sizes = sizes
+        self.rounds = rounds
+        self.report = report
+        self.random = random.Random(seed)
+
+        # One dict per size and phase
+        self.results = []
+
+    def make_servers(self, count):
+        """
+        :return: dict - servers in the self.servers format, spread over a few groups and probe types
+        """
+        servers = {}
+        for i in range(count):
+            servers[f"bench-{i}"] = {
+                'url': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                'port': 80 if i % 2 else 443,
+                'type': "tcp" if i % 3 else "tls",
+                'web': False,
+                'check': None,
+                'group': f"group-{i % const.BENCHMARK_GROUPS}",
+                'parent': ""
+            }
+        return servers
+
+    def make_response(self, server, up):
+        return {"status": "Online" if up else "Refused",
+                "ipv4/6": "IPv4",
+                "port": server['port'],
+                "url": server['url'],
+                "is_web": False,
+                "type": server['type'],
+                "up": up,
+                "latency": self.random.uniform(0.001, 0.2) if up else None
+                }
+
+    def measure(self, size, phase, count, duration, meter):
+        result = {
+            'size': size,
+            'phase': phase,
+            'count': count,
+            'seconds': round(duration, 4),
+            'per_second': round(count / duration) if duration else 0,
+            'max_stall_ms': round(meter.result() * 1000, 1),
+            'rss_mb': None if get_rss() is None else round(get_rss() / 1024 / 1024, 1),
+        }
+        self.results.append(result)
+        self.logger.info("%d servers | %s: %s/s | max stall %sms | rss %sMB", size, phase,
+                         result['per_second'], result['max_stall_ms'], result['rss_mb'])
+        return result
+
+    def phase_load(self, tool, size, meter):
+        servers = self.make_servers(size)
+        ConfigHandler.atomic_write(tool.path(const.SERVER_FILE),
+                                   pickle.dumps(servers, protocol=pickle.HIGHEST_PROTOCOL), mode='wb')
+        # Written by us, the file watcher doesn't need to reload it
+        tool.config.watcher.touch(tool.path(const.SERVER_FILE))
+
+        self.app.processEvents()
+        meter.reset()
+        started = time.perf_counter()
+        tool.load_servers()
+        duration = time.perf_counter() - started
+        self.app.processEvents()
+
+        self.measure(size, "load_servers", size, duration, meter)
+
+    def phase_responses(self, tool, size, meter):
+        names = list(tool.servers)
+        up = dict.fromkeys(names, True)
+
+        self.app.processEvents()
+        meter.reset()
+        started = time.perf_counter()
+        count = 0
+        for sweep in range(self.rounds):
+            # First round everything comes up, after that a share flips every round
+            if sweep:
+                for name in self.random.sample(names, int(len(names) * const.BENCHMARK_FLIP)):
+                    up[name] = not up[name]
+
+            for start in range(0, len(names), const.BENCHMARK_BATCH):
+                for name in names[start:start + const.BENCHMARK_BATCH]:
+                    tool.server_response(self.make_response(tool.servers[name], up[name]), name)
+                    count += 1
+                self.app.processEvents()
+        duration = time.perf_counter() - started
+
+        self.measure(size, "server_response", count, duration, meter)
+
+    def phase_search(self, tool, size, meter):
+        # One group out of BENCHMARK_GROUPS stays visible, then everything comes back
+        query = f"group-{const.BENCHMARK_GROUPS - 1}"
+
+        self.app.processEvents()
+        meter.reset()
+        started = time.perf_counter()
+        tool.apply_search(query)
+        self.app.processEvents()
+        matched = len(tool.search_result)
+        tool.apply_search("")
+        self.app.processEvents()
+        duration = time.perf_counter() - started
+
+        self.measure(size, "apply_search", 2 * (size - matched), duration, meter)
+
+    def phase_delete(self, tool, size, meter):
+        table = tool.settings_view
+        model = tool.server_list_settings
+        step = max(1, round(1 / const.BENCHMARK_DELETE))
+
+        # Every step-th row, like a user ctrl-clicking through the list
+        selection = QItemSelection()
+        for row in range(0, model.rowCount(), step):
+            selection.select(model.index(row, 0), model.index(row, model.columnCount() - 1))
+        table.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+        count = len(range(0, model.rowCount(), step))
+
+        self.app.processEvents()
+        meter.reset()
+        started = time.perf_counter()
+        tool.server_delete_clicked()
+        duration = time.perf_counter() - started
+        self.app.processEvents()
+
+        self.measure(size, "server_delete_clicked", count, duration, meter)
+
+    def run_size(self, size):
+        # Imported here, the tool module sets up logging on import
+        from tool.tool import ConnectionTool
+
+        # Config, server list and snapshot go to a scratch directory, removed afterwards
+        # A fresh one per size, so nothing (server list, snapshot) carries over to the next size
+        with ConfigHandler.scratch_dir("connectiontool-benchmark-") as workdir:
+            tool = ConnectionTool(base_dir=workdir)
+            self.app.processEvents()
+            # Only the benchmark feeds results, nothing gets checked or notified
+            tool.timer.stop()
+            tool.probing = False
+            tool.notify = False
+
+            meter = StallMeter()
+            meter.start()
+            try:
+                self.phase_load(tool, size, meter)
+                self.phase_responses(tool, size, meter)
+                self.phase_search(tool, size, meter)
+                self.phase_delete(tool, size, meter)
+            finally:
+                meter.stop()
+                tool.close()
+                tool.deleteLater()
+                self.app.processEvents()
+
+    def write_report(self):
+        with open(self.report, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(self.results[0]))
+            writer.writeheader()
+            writer.writerows(self.results)
+
+    def run(self):
+        """
+        :return: int - Exit code
+        """
+        for size in self.sizes:
+            self.run_size(size)
+
+        if self.report:
+            self.write_report()
+
+        self.logger.info("Benchmark finished\n\t" + "\n\t".join(
+            f"{r['size']:>6} | {r['phase']:<22} | {r['per_second']:>8}/s | "
+            f"max stall {r['max_stall_ms']:>8}ms | rss {r['rss_mb']}MB" for r in self.results))
+        return 0
@@ -1,6 +1,130 @@
 import configparser
-from os.path import isfile
-from os import getcwd
+import threading
+from contextlib import contextmanager
+from os.path import isfile, getmtime, dirname, basename, join
+from os import getcwd, replace, remove, fsync, makedirs
+from shutil import rmtree
+from tempfile import NamedTemporaryFile, mkdtemp
+from io import StringIO
+
+import tool.Constants as const
+
+
+def atomic_write(filename, data, mode='w', encoding='utf-8'):
+    """
+    Writes data to a temp file next to filename, then renames it over the original.
+    A crash or concurrent reader never sees a half written file
+    :param filename: str - Full path of the file to (over)write
+    :param data: str or bytes - The new file contents
+    :param mode: str - 'w' for text, 'wb' for bytes
+    :param encoding: str - Only used in text mode
+    """
+    # Temp file has to be in the same directory, rename is only atomic on the same filesystem
+    tmp = NamedTemporaryFile(mode=mode,
+                             encoding=None if 'b' in mode else encoding,
+                             dir=dirname(filename) or None,
+                             prefix=f".{basename(filename)}.",
+                             suffix=".tmp",
+                             delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+            tmp.flush()
+            fsync(tmp.fileno())
+        replace(tmp.name, filename)
+    except Exception:
+        # Don't leave temp files lying around if anything went wrong
+        if isfile(tmp.name):
+            remove(tmp.name)
+        raise
+
+
+def local_path(base, filename):
+    """
+    The file constants are written Windows style ("\\config\\config.ini"),
+    this joins them onto base with the separators of the OS the tool runs on
+    :param base: str - directory, e.g. ConnectionTool.dir
+    :param filename: str - e.g. const.CONFIG_FILENAME
+    :return: str
+    """
+    return join(base, *[part for part in filename.replace("\\", "/").split("/") if part])
+
+
+@contextmanager
+def scratch_dir(prefix):
+    """
+    Throwaway base directory for a ConnectionTool (soak, replay, benchmark),
+    with the config folder it expects. Removed with everything in it afterwards
+    :param prefix: str - for the directory name
+    :return: str - full path, pass it as the tool's base_dir
+    """
+    workdir = mkdtemp(prefix=prefix)
+    try:
+        makedirs(dirname(local_path(workdir, const.CONFIG_FILENAME)))
+        yield workdir
+    finally:
+        rmtree(workdir, ignore_errors=True)
+
+
+class FileWatcher(threading.Thread):
+    """
+    Polls the modification time of a set of files from a background thread
+    Calls the registered callback with the filename whenever a file changed on disk
+
+    Polling keeps this free of any platform specific dependencies,
+    a stat() every few seconds costs next to nothing
+    """
+
+    def __init__(self, interval, logger):
+        super().__init__(name="FileWatcher", daemon=True)
+
+        self.logger = logger
+        self.interval = interval
+
+        # {filename: [mtime, callback]}
+        self.files = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def watch(self, filename, callback):
+        with self.lock:
+            self.files[filename] = [self.get_mtime(filename), callback]
+
+    def touch(self, filename):
+        """
+        Store the current mtime of a file without triggering its callback
+        Used after we wrote the file ourselves
+        """
+        with self.lock:
+            if filename in self.files:
+                self.files[filename][0] = self.get_mtime(filename)
+
+    def stop(self):
+        self.stopped.set()
+
+    @staticmethod
+    def get_mtime(filename):
+        try:
+            return getmtime(filename)
+        except OSError:
+            return None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                changed = []
+                for filename, entry in self.files.items():
+                    mtime = self.get_mtime(filename)
+                    if mtime is not None and mtime != entry[0]:
+                        entry[0] = mtime
+                        changed.append((filename, entry[1]))
+
+            # Callbacks run outside the lock, they are allowed to call touch()/watch()
+            for filename, callback in changed:
+                try:
+                    callback(filename)
+                except Exception as e:
+                    self.logger.error("Exception caught in reload callback for '%s'", filename, exc_info=e)
 
 
 class ConfigHandler:
@@ -9,6 +133,15 @@ class ConfigHandler:
     Reading, writing, updating the config file.
     and returning any requested values or sections
 
+    Values are parsed to their type (int, float, bool, str) once on load and
+    kept in a cache, get_value() never re-parses strings.
+    Writes are debounced, a burst of update_value() calls results in a single
+    atomic write from a background thread after CONFIG_WRITE_DELAY seconds.
+    Changes made to the file on disk by something else get picked up automatically,
+    listeners registered through add_listener() get the changed keys.
+    Values changed in the tool but not written yet survive a reload, unless the
+    edit on disk changed that same value - then the edit on disk wins.
+
     Config layout:
     DEFAULT - Section - contains most of the general stuff
         such as the interval timer and whether to notify on status change
@@ -16,14 +149,40 @@ class ConfigHandler:
         such as width, height and location
     """
 
-    def __init__(self, filename, logger):
+    def __init__(self, filename, logger, base_dir=None):
+        """
+        :param filename: str - const.CONFIG_FILENAME
+        :param logger: logging.Logger
+        :param base_dir: str - directory the filename is in, defaults to the working directory
+        """
 
         # config parser
         self.config = configparser.ConfigParser()
 
         # local variables
         self.logger = logger
-        self.filename = getcwd() + filename
+        self.filename = local_path(base_dir or getcwd(), filename)
+
+        # Typed values, {(section, value_name): value}
+        self.values = {}
+
+        # Guards self.config and self.values, updates can come from the file watcher thread
+        self.lock = threading.RLock()
+
+        # Pending debounced write, if any
+        self.write_timer = None
+        # Values changed through update_value()/update_section() since the last write
+        # {(section, value_name): str}
+        self.pending = {}
+        # Typed values as they are in the file on disk, tells an edit on disk apart from our own changes
+        self.disk_values = {}
+        # Contents of our last write, the file watcher may still report it as a change
+        self.written = None
+        # A write and a reload never run at the same time
+        self.io_lock = threading.Lock()
+
+        # Called with a set of changed (section, value_name) keys after a reload
+        self.listeners = []
 
         # init, check if config file exists
         if isfile(self.filename):
@@ -31,14 +190,29 @@ class ConfigHandler:
             self.logger.debug("Config file exists, loading values...")
             self.load_config()
         else:
-            self.logger.error(f"Config file '{filename}' not found!\n"
-                              "Making default config")
+            self.logger.error("Config file '%s' not found!\n"
+                              "Making default config", filename)
             self.make_default_config()
 
+        # Watch the config file for changes made outside the tool
+        self.watcher = FileWatcher(const.CONFIG_RELOAD_INTERVAL, self.logger)
+        self.watcher.watch(self.filename, self.reload_config)
+        self.watcher.start()
+
     def make_default_config(self):
         self.config['DEFAULT'] = {
             'interval_checks': '30',
-            'notify_status_change': 'True'
+            'notify_status_change': 'True',
+            'timeout_min': str(const.MIN_TIMEOUT),
+            'timeout_max': str(const.MAX_TIMEOUT),
+            'timeout_factor': str(const.TIMEOUT_FACTOR),
+            'retry_on_timeout': 'True',
+            'content_max_bytes': str(const.CONTENT_MAX_BYTES),
+            'parent_down_check_every': str(const.PARENT_DOWN_CHECK_EVERY),
+            'max_per_host': str(const.MAX_PER_HOST),
+            'connection_rate': str(const.CONNECTION_RATE),
+            'connection_burst': str(const.CONNECTION_BURST),
+            'push_api_port': str(const.PUSH_API_PORT)
         }
         self.config['WINDOW'] = {
             'width': '800',
@@ -47,24 +221,194 @@ class ConfigHandler:
             'location_y': '0',
             'custom_style': 'False'
         }
+        self.build_cache()
         self.write_config()
 
+    # == Typed value cache ==
+    @staticmethod
+    def parse_value(value):
+        """
+        Converts a raw config string to the type it looks like
+        :param value: str
+        :return: int, float, bool or str
+        """
+        lowered = value.strip().lower()
+        if lowered in ("true", "false"):
+            return lowered == "true"
+
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                pass
+
+        return value
+
+    @classmethod
+    def parse_config(cls, config):
+        """
+        :param config: configparser.ConfigParser
+        :return: dict - {(section, value_name): typed value}
+        """
+        values = {}
+        # Sections inherit the DEFAULT values, so DEFAULT needs its own pass
+        for section in ["DEFAULT"] + config.sections():
+            for value_name, value in config[section].items():
+                values[(section, value_name)] = cls.parse_value(value)
+        return values
+
+    def build_cache(self):
+        """
+        Rebuilds self.values from the configparser
+        :return: dict - The new cache
+        """
+        self.values = self.parse_config(self.config)
+        return self.values
+
     # == Reading/Writing config-file ==
     def load_config(self):
-        self.config.read(self.filename, encoding='utf-8')
+        with self.lock:
+            self.config.read(self.filename, encoding='utf-8')
+            self.disk_values = dict(self.build_cache())
+
+    def reload_config(self, filename=None):
+        """
+        Called by the file watcher once the config file changed on disk.
+        Reads the file into a fresh parser, swaps it in and tells the listeners what changed
+        A pending write is cancelled first, our unwritten changes go on top of the new
+        contents (and get written again) unless the edit on disk changed the same value
+        """
+        with self.io_lock:
+            try:
+                with open(self.filename, encoding='utf-8') as handle:
+                    contents = handle.read()
+            except OSError as e:
+                self.logger.warning("Unable to reload config, keeping current values - %s", e)
+                return
+
+            # Our own write, seen by the watcher before write_config() got to touch() it
+            if contents == self.written:
+                return
+
+            new_config = configparser.ConfigParser()
+            try:
+                new_config.read_string(contents, source=self.filename)
+            except configparser.Error as e:
+                # Probably caught the file halfway through someone editing it, keep the old values
+                self.logger.warning("Unable to reload config, keeping current values - %s", e)
+                return
+
+            with self.lock:
+                if self.write_timer is not None:
+                    self.write_timer.cancel()
+                    self.write_timer = None
+
+                new_disk = self.parse_config(new_config)
+                edited = {key for key in set(self.disk_values) | set(new_disk)
+                          if self.disk_values.get(key) != new_disk.get(key)}
+                overruled = sorted(key for key in self.pending if key in edited)
+                if overruled:
+                    self.logger.info("Config edited on disk, dropping unwritten changes to: %s", overruled)
+
+                pending = {key: value for key, value in self.pending.items() if key not in edited}
+                for (section, value_name), value in pending.items():
+                    if section != "DEFAULT" and not new_config.has_section(section):
+                        new_config.add_section(section)
+                    new_config[section][value_name] = value
+
+                old_values = self.values
+                self.config = new_config
+                self.disk_values = new_disk
+                self.pending = pending
+                new_values = self.build_cache()
+
+        if pending:
+            self.schedule_write()
+
+        changed = {key for key in set(old_values) | set(new_values)
+                   if old_values.get(key) != new_values.get(key)}
+
+        if not changed:
+            return
+
+        self.logger.info("Config reloaded, changed: %s", sorted(changed))
+        for listener in self.listeners:
+            listener(changed)
 
     def write_config(self):
-        try:
-            self.logger.debug(f"filename: {self.filename} | cwd: {getcwd()}")
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                self.config.write(f)
-        except Exception as e:
-            self.logger.error("Exception caught writing config", exc_info=e)
+        """
+        Writes the config to disk right away, atomically (temp file + rename)
+        Use schedule_write() for anything that could be called often
+        """
+        with self.io_lock:
+            with self.lock:
+                self.write_timer = None
+                contents = self.dump_config()
+                pending = self.pending
+                self.pending = {}
+                values = dict(self.values)
+
+            try:
+                self.logger.debug("filename: %s | cwd: %s", self.filename, getcwd())
+                atomic_write(self.filename, contents)
+            except Exception as e:
+                self.logger.error("Exception caught writing config", exc_info=e)
+                # Still unwritten, changes made since then go on top
+                with self.lock:
+                    self.pending = {**pending, **self.pending}
+                return
+
+            self.written = contents
+            self.disk_values = values
+            # Don't reload our own write
+            if getattr(self, "watcher", None) is not None:
+                self.watcher.touch(self.filename)
+
+    def dump_config(self):
+        buffer = StringIO()
+        self.config.write(buffer)
+        return buffer.getvalue()
+
+    def schedule_write(self):
+        """
+        (Re)starts the debounce timer, the actual write happens on a background thread
+        once no new changes came in for CONFIG_WRITE_DELAY seconds
+        """
+        with self.lock:
+            if self.write_timer is not None:
+                self.write_timer.cancel()
+
+            self.write_timer = threading.Timer(const.CONFIG_WRITE_DELAY, self.write_config)
+            self.write_timer.daemon = True
+            self.write_timer.start()
+
+    def flush(self):
+        """
+        Writes any pending changes right now, call this before exiting
+        """
+        with self.lock:
+            pending = self.write_timer
+            if pending is not None:
+                pending.cancel()
+
+        if pending is not None:
+            self.write_config()
+
+    def close(self):
+        self.flush()
+        self.watcher.stop()
+
+    def add_listener(self, listener):
+        """
+        :param listener: callable(set) - Gets called with the changed (section, value_name) keys
+        Note: gets called from the file watcher thread
+        """
+        self.listeners.append(listener)
 
     # == Updating values/sections ==
     def update_value(self, section, value_name, new_value):
         """
-        Updates the value in the configparser, then writes it to the config file
+        Updates the value in the configparser, then schedules a write to the config file
         :param section: str - Section/Key for the config dict
         :param value_name: str - The key for the value inside the section
         :param new_value: str - New value, gets formatted to string for output
@@ -74,8 +418,15 @@ class ConfigHandler:
         """
         if not isinstance(new_value, str):
             new_value = str(new_value)
-        self.config[section][value_name] = new_value
-        self.write_config()
+        with self.lock:
+            self.config[section][value_name] = new_value
+            self.pending[(section, value_name)] = new_value
+            if section == "DEFAULT":
+                # Every section inherits DEFAULT, rebuild all of them
+                self.build_cache()
+            else:
+                self.values[(section, value_name)] = self.parse_value(new_value)
+        self.schedule_write()
 
     def update_section(self, section, new_values):
         if not isinstance(new_values, dict):
@@ -83,29 +434,43 @@ class ConfigHandler:
                                 f"Expected {type(dict)} | Got: {type(new_values)}")
             raise TypeError
         else:
-            self.config[section] = new_values
-            self.write_config()
+            with self.lock:
+                self.config[section] = new_values
+                for value_name in new_values:
+                    value_name = self.config.optionxform(value_name)
+                    self.pending[(section, value_name)] = self.config[section][value_name]
+                self.build_cache()
+            self.schedule_write()
 
     # == getting values/sections ==
-    def get_value(self, value_name, section="DEFAULT", return_type=None):
+    def get_value(self, value_name, section="DEFAULT", return_type=None, fallback=None):
         """
-        Simple gets the value from the configparser and returns it,
+        Gets the value from the cache and returns it,
         default type for returning is a string, unless requested otherwise
         :param value_name:
         :param section:
-        :param return_type:
+        :param return_type: int, float or bool - returns the cached, already parsed value
+        :param fallback: returned if the value is not in the config (older config files)
         :return: string, unless return_type is given
         """
-        if return_type is int:
-            try:
-                value = int(self.config[section][value_name])
-                return value
-            except ValueError:
-                self.logger.error("Unable to return requested type in get_value\n"
-                                  f"Requested type was '{return_type}' "
-                                  f"for value: {self.config[section][value_name]}")
+        key = (section, value_name)
+        if key not in self.values:
+            if fallback is None:
+                raise KeyError(value_name)
+            return fallback
+
+        if return_type in (int, float, bool):
+            value = self.values[key]
+            # bool is a subclass of int, don't hand out True when asked for a number
+            if type(value) is return_type or (return_type is float and type(value) is int):
+                return return_type(value)
+
+            self.logger.error("Unable to return requested type in get_value\n"
+                              f"Requested type was '{return_type}' "
+                              f"for value: {self.config[section][value_name]}")
+            return fallback
         else:
-            if return_type is not None:
+            if return_type not in (None, str):
                 self.logger.warning("Returning value as default, requested type not available")
 
             return self.config[section][value_name]
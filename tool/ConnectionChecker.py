@@ -1,143 +1,59 @@
-from PyQt5.QtCore import QThread, pyqtSignal
-import tool.Constants as const
-import socket
-import requests
+from PyQt5.QtCore import QObject, pyqtSignal
+from tool import Probes
 
+# Statuses that mean the check ran into its timeout, not that the server said no
+TIMEOUT_STATUSES = ("Request timed out", "Unknown/Timed out", Probes.TIMED_OUT)
 
-class ConnectionWorker(QThread):
+
+class ProbeDispatcher(QObject):
+    """
+    Hands every check to the executor of its probe type (see tool/Probes)
+    Executors are made on first use, one per type, and run all checks of that type batched
+    Results come back through worker_response on the GUI thread
+    """
     worker_response = pyqtSignal(dict, str)     # Return/emit types
 
-    def __init__(self, name, ip, port, is_website, logger=None):
-        QThread.__init__(self)
+    def __init__(self, logger=None):
+        super().__init__()
 
         self.logger = logger
 
-        self.name = name
-        self.ip = ip
-        self.port = port
-        self.is_website = is_website
-        self.response = ""
+        # {type name: ProbeExecutor}
+        self.executors = {}
+
+    def executor(self, type_name):
+        executor = self.executors.get(type_name)
+        if executor is None:
+            executor = self.executors[type_name] = Probes.PROBE_TYPES[type_name](self.finished, self.logger)
+        return executor
 
-    def run_webcheck(self):
+    def submit(self, probe):
         """
-        First it formats the given url/ip and port to a workable format
-        Then it runs a check on the given url and port, treating it as a website/http server
-        Stores results in self.response
-        :return:
+        Starts a check, the result comes in through worker_response(response, probe.name)
+        :param probe: Probes.Probe
         """
+        self.executor(probe.type).submit(probe)
 
-        url = self.format_url(self.ip, self.port)
-
-        # Requests requires a url to have either, 'http' or 'https' infront
-        try:
-            req = requests.get(url, stream=True)
-
-            # Get status code and description
-            status = f"[{req.status_code}] - {req.reason}"
-
-            # Get server ip from url
-            ipv46 = req.raw._connection.sock.getsockname()[0]
-
-            # Close connection
-            req.close()
-
-            # Lots of error handling
-        except requests.exceptions.ConnectionError:
-            # Server offline or atleast, from the clients point is unable to make any connection
-            status = "OFFLINE"
-            ipv46 = "OFFLINE"
-        except requests.exceptions.Timeout:
-            # Request timed out
-            status = "Request timed out"
-            ipv46 = "TIMEOUT"
-        except requests.exceptions.TooManyRedirects:
-            # Got redirected too many times
-            status = "Redirect limit"
-            ipv46 = "REDIRECTED"
-        except requests.exceptions.RequestException as ex:
-            if self.logger is not None:
-                # If logger is set, log error message
-                self.logger.debug(f"Uncaught exception - run_webcheck()\n\t"
-                                  f"- {ex}")
-            status = "Unknown exception"
-            ipv46 = "Unknown exception"
-
-        self.response = {"status": status,
-                         "ipv4/6": ipv46,
-                         "port": self.port,
-                         "url": self.ip,
-                         "is_web": True
-                         }
-
-    def run_socketcheck(self):
-        try:
-            sock = socket.create_connection((self.ip, self.port), timeout=const.MAX_TIMEOUT)
-            s_family = "IPv6" if socket.AddressFamily.AF_INET6 == sock.family else "IPv4"
-            s_raddr = sock.getpeername()
-            sock.close()
-
-            status = "Online"
-        except socket.gaierror:
-            status = "Offline"
-            s_family = "None"
-        except ConnectionRefusedError:
-            status = "Refused"
-            s_family = "Connection refused"
-        except TimeoutError:
-            status = "Unknown/Timed out"
-            s_family = "Timeout"
-        except Exception as ex:
-            if self.logger is not None:
-                self.logger.debug("Caught exception - run_socketcheck()\n\t"
-                                  f"- {ex}")
-
-        self.response = {"status": status,
-                         "ipv4/6": s_family,
-                         "port": str(self.port),
-                         "url": self.ip,
-                         "is_web": False
-                         }
-
-    @staticmethod
-    def format_url(url, port):
+    def finished(self, probe, response):
         """
-        Formats the given url and port so it is valid for the requests.get()
-        :param url: str
-        :param port: int
-        :return: new_url -> str
+        Called by the executors, from their own thread
         """
-        new_url = ""
-        url_s = url.split("/")
-
-        if "http" in url:
-            # Get rid of first 2 items in list
-            # No need to add "or 'https'" as that includes the 'http' check already
-            http = url_s[0]    # we require http later, save it so we know what the user provided (http, https)
-            url_s = url_s[2:]
-        else:
-            http = "http"
-
-        new_url = url_s[0] + f":{port}"
-
-        # The url had sub-dirs after the part where we place our port
-        if len(url_s) > 1:
-            new_url += "/"
-            new_url += "/".join(url_s[1:])
-
-        # Prepend the http(s) to the url again and return
-        return http + "://" + new_url
-
-    def validate_ip(self):
-        pass
+        # Timed out on the (adaptive) timeout, give it one more go before calling it down
+        # The retry keeps the check's scheduler slot, it is still the same check
+        if response['status'] in TIMEOUT_STATUSES and not probe.retried and probe.retry_timeout is not None:
+            if self.logger is not None:
+                self.logger.debug("%s timed out after %.2fs, retrying with %.2fs",
+                                  probe.name, probe.timeout, probe.retry_timeout)
+            self.submit(probe.retry())
+            return
 
-    def run(self):
-        if self.is_website:
-            self.run_webcheck()
-        else:
-            self.run_socketcheck()
+        if probe.retried:
+            response['retried'] = True
 
-        self.worker_response.emit(self.response, self.name)
+        # Queued over to the GUI thread, the receiver lives there
+        self.worker_response.emit(response, probe.name)
 
-        # Unsure on how to clean up this thread after it's done
-        # This might not work
-        self.isFinished()
+    def stop(self):
+        for executor in self.executors.values():
+            executor.stop()
+        self.executors.clear()
@@ -4,19 +4,83 @@ LOGGER_DATE_FORMAT = '%H:%M:%S'     # '%d/%m/%Y - %H:%M:%S'
 DEBUG_MODE = True                   # Debug if True, else Info mode
 DEBUG_OUT = False                   # True -> output logs to file, False -> Console
 DEBUG_FILE = "../logs.txt"  # log output filename
+LOG_JSON = False                    # True -> one JSON object per line instead of LOGGER_FORMAT
+LOG_QUEUE_SIZE = 10000              # Records waiting for the background writer, more get dropped
+LOG_SAMPLING = {}                   # Share of DEBUG records kept per subsystem (logger name prefix), e.g.
+                                    # {"tool.ConnectionTool.responses": 0.1, "tool.Probes": 0.5}
 
 # Connection Checker settings
-MAX_TIMEOUT = 10
+MAX_TIMEOUT = 10                    # Upper bound for the adaptive timeout, in seconds
+MIN_TIMEOUT = 0.5                   # Lower bound for the adaptive timeout, in seconds
+TIMEOUT_FACTOR = 3                  # Adaptive timeout = latency percentile * factor
+TIMEOUT_PERCENTILE = 99             # Latency percentile the adaptive timeout is based on
+TIMEOUT_SAMPLES = 100               # Latencies kept per server for the adaptive timeout
+TIMEOUT_MIN_SAMPLES = 5             # Below this many samples, MAX_TIMEOUT is used
+RETRY_TIMEOUT_FACTOR = 2            # Retry after a timeout = timeout * factor, first try + retry <= MAX_TIMEOUT
+CONTENT_MAX_BYTES = 64 * 1024       # Content checks stop reading the body after this many bytes
+CONTENT_CHUNK_SIZE = 8 * 1024       # Bytes per read while streaming the body for a content check
+POOL_WORKERS = 16                   # Threads per probe type that can only do blocking checks (http)
+RESOLVER_THREADS = 4                # Threads looking up hostnames for the non-blocking probe types
+TLS_EXPIRY_WARN_DAYS = 14           # TLS checks warn once the certificate expires within this many days
+MAX_PER_HOST = 4                    # Checks running against the same host at once, 0 = no limit
+CONNECTION_RATE = 50                # New connections per second over all hosts, 0 = no limit
+CONNECTION_BURST = 50               # Connections that may start at once after a quiet period
 
 # Config settings
 CONFIG_FILENAME = "\\config\\config.ini"  # Filename for the config
 SERVER_FILE = "\\config\\servers.pickle"  # Filename containing all saved servers
+CONFIG_WRITE_DELAY = 1.0            # Seconds to wait for more changes before writing the config
+CONFIG_RELOAD_INTERVAL = 2.0        # Seconds between checking the config/server files for changes
+SNAPSHOT_FILE = "\\config\\snapshot.pickle"  # Last known results, shown (as stale) on the next launch
 
 # Default values
 DEFAULT_INTERVAL = 30               # Default interval between checks
+PARENT_DOWN_CHECK_EVERY = 5         # While its parent is down, a server only gets checked every x checks
 DELETE_WARNING = 5                  # Have the user confirm,
                                     # if he wants to delete more than x servers
 
+# History settings
+HISTORY_VIEW_SECONDS = 7 * 24 * 3600                        # Time span shown in the history column
+HISTORY_RESOLUTION = 300                                    # Seconds per stored history bucket (min/max latency, down)
+HISTORY_CACHE_SIZE = 500                                    # Servers with a cached downsampled history
+
+# Uptime/latency statistics settings
+LATENCY_MIN = 0.0001                # Smallest latency the histograms tell apart, seconds
+LATENCY_MAX = 60                    # Largest latency the histograms tell apart, seconds
+LATENCY_BIN_GROWTH = 1.05           # Histogram bin width growth, percentiles are within ~2.5%
+LATENCY_PERCENTILES = (50, 95, 99)  # Latency percentiles shown/exported per server
+LATENCY_WINDOW = "24h"              # Window the latency percentiles column is based on
+LATENCY_REFRESH = 1.0               # Seconds between redraws of the latency percentiles column
+
+# Soak test settings (py main.py --soak)
+SOAK_TARGETS = 30                   # Default number of stand-in servers to check
+SOAK_SWEEP_TIMEOUT = 60             # Seconds a single check may take before the soak gives up
+SOAK_MAX_RSS_GROWTH_MB = 20         # Allowed memory growth after the warm up
+SOAK_MAX_THREAD_GROWTH = 5          # Allowed growth in live (Q)threads after the warm up
+SOAK_MAX_OBJECT_GROWTH = 50         # Allowed growth in live Qt objects after the warm up
+SOAK_SNAPSHOT_EVERY = 500           # Log the top memory allocators every x checks
+SOAK_TOP_ALLOCATORS = 10            # How many allocators to log
+
+# Benchmark settings (py main.py --benchmark)
+BENCHMARK_SIZES = "1000,10000,50000"  # Default number of servers per run
+BENCHMARK_ROUNDS = 3                # Results per server in the server_response phase
+BENCHMARK_FLIP = 0.2                # Share of the servers that flips status every round
+BENCHMARK_BATCH = 500               # Results fed between two turns of the event loop
+BENCHMARK_DELETE = 0.1              # Share of the servers deleted in the server_delete_clicked phase
+BENCHMARK_GROUPS = 20               # Groups the servers are spread over
+
+# Push API settings
+PUSH_API_PORT = 0                   # Loopback port for the push API, 0 = off
+PUSH_HOST = "127.0.0.1"             # Only local tools can subscribe, there is no authentication
+PUSH_BATCH_INTERVAL = 1.0           # Seconds between latency batches
+PUSH_HEARTBEAT = 15                 # Seconds between heartbeats on idle streams
+PUSH_QUEUE_SIZE = 1000              # Events queued per subscriber, a slower one misses events
+PUSH_MAX_SUBSCRIBERS = 256          # Connections beyond this get a 503
+PUSH_INBOX_SIZE = 100000            # Results waiting for the push API thread, the oldest go first (reported as dropped)
+
+# Replay settings (py main.py --replay)
+REPLAY_SLICE = 0.05                 # Longest stretch of replaying on the GUI thread before the event loop gets a turn
+
 # Window settings
 WINDOW_TITLE = "Sain's connection checker"
 
@@ -0,0 +1,234 @@
+"""
+Content checks for website servers, run over the streamed response body
+Each check gets fed the body chunk by chunk and says when it has seen enough,
+so a match near the top of a page never downloads the rest of it.
+The caller stops feeding once max_bytes is reached, whatever the check says.
+
+Server list format: 'check': {'type': 'substring' | 'regex' | 'json', 'value': str}
+"""
+
+import json
+import re
+
+try:
+    # Only used to work out how long a regex match can get
+    from re import _parser as sre_parse
+except ImportError:
+    # Before Python 3.11
+    import sre_parse
+
+import tool.Constants as const
+
+
+class ContentCheck:
+    """
+    Base class, subclasses implement feed() and finish()
+    """
+    type_name = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def feed(self, chunk):
+        """
+        :param chunk: bytes - The next part of the body
+        :return: bool - True once the result is known, no more chunks needed
+        """
+        raise NotImplementedError
+
+    def finish(self, truncated):
+        """
+        :param truncated: bool - True if the body got cut off at max_bytes
+        :return: (bool, str) - passed, description for the status column
+        """
+        raise NotImplementedError
+
+
+class SubstringCheck(ContentCheck):
+    """
+    Body has to contain the given text
+    Only keeps the last len(text) - 1 bytes between chunks, a match can span 2 chunks
+    """
+    type_name = "substring"
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.needle = value.encode('utf-8')
+        self.tail = b""
+        self.found = False
+
+    def feed(self, chunk):
+        data = self.tail + chunk
+        if self.needle in data:
+            self.found = True
+            return True
+
+        self.tail = data[-(len(self.needle) - 1):] if len(self.needle) > 1 else b""
+        return False
+
+    def finish(self, truncated):
+        if self.found:
+            return True, "content OK"
+        return False, "text not found" + (" (size limit)" if truncated else "")
+
+
+# Anchors that only look at what comes before them, the rest ($, \Z, \b, \B) also look
+# at what follows, which isn't known before the end of the body
+_LEADING_ANCHORS = (sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_LINE, sre_parse.AT_BEGINNING_STRING)
+
+
+def _looks_ahead(items):
+    """
+    :param items: parsed pattern (sre_parse.SubPattern), or any part of one
+    :return: bool - True if a match depends on the bytes after it (end anchors,
+             word boundaries, lookaheads), so it can't be trusted on a partial body
+    """
+    for op, av in items:
+        if op is sre_parse.AT and av not in _LEADING_ANCHORS:
+            return True
+        if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT) and av[0] > 0:
+            return True
+        if any(_looks_ahead(part) for part in _subpatterns(av)):
+            return True
+    return False
+
+
+def _subpatterns(av):
+    """
+    :return: every nested pattern in the arguments of a parsed pattern item
+    """
+    if isinstance(av, sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (tuple, list)):
+        for part in av:
+            yield from _subpatterns(part)
+
+
+class RegexCheck(ContentCheck):
+    """
+    Body has to match the given regular expression
+    Keeps the body seen so far (bounded by max_bytes, which the caller enforces), but
+    never searches it twice: a new match has to end in the new chunk, so with a match of
+    at most n bytes only the last n - 1 bytes before it get searched again.
+    Patterns without a (reasonable) longest match, like 'a.*b', or that look past the end of
+    their match, like 'up$' or 'up(?=time)', run once at the end instead
+    """
+    type_name = "regex"
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.pattern = re.compile(value.encode('utf-8'))
+        self.body = bytearray()
+        self.found = False
+
+        parsed = sre_parse.parse(self.pattern.pattern, self.pattern.flags)
+        longest = parsed.getwidth()[1]
+        # None - only search once the whole body is in
+        self.longest = longest if longest < const.CONTENT_MAX_BYTES and not _looks_ahead(parsed) else None
+
+    def feed(self, chunk):
+        searched = len(self.body)
+        self.body += chunk
+        if self.longest is None:
+            return False
+
+        # Searching from pos, not a slice, keeps ^ and lookbehinds working on the whole body
+        if self.pattern.search(self.body, max(0, searched - self.longest + 1)):
+            self.found = True
+            return True
+        return False
+
+    def finish(self, truncated):
+        if not self.found and self.longest is None:
+            self.found = self.pattern.search(self.body) is not None
+
+        if self.found:
+            return True, "content OK"
+        return False, "regex not matched" + (" (size limit)" if truncated else "")
+
+
+class JsonFieldCheck(ContentCheck):
+    """
+    Body has to be JSON containing the given field, optionally with a given value
+    value format: "path.to.field" or "path.to.field=expected", list indexes are numbers
+    JSON can only be judged once the whole document is in, no early exit here
+    """
+    type_name = "json"
+
+    def __init__(self, value):
+        super().__init__(value)
+        path, separator, expected = value.partition("=")
+        self.path = [part for part in path.strip().split(".") if part]
+        self.expected = expected.strip() if separator else None
+        self.body = bytearray()
+
+    def feed(self, chunk):
+        self.body += chunk
+        return False
+
+    def finish(self, truncated):
+        if truncated:
+            return False, "JSON too large (size limit)"
+
+        try:
+            field = json.loads(self.body.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            return False, "invalid JSON"
+
+        for part in self.path:
+            try:
+                field = field[int(part)] if isinstance(field, list) else field[part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                return False, f"field '{'.'.join(self.path)}' missing"
+
+        if self.expected is None:
+            return True, "content OK"
+
+        # Compare as JSON text so 'true', '1' and '"up"' work as expected values
+        actual = field if isinstance(field, str) else json.dumps(field)
+        if actual == self.expected or json.dumps(field) == self.expected:
+            return True, "content OK"
+        return False, f"field is {actual}"
+
+
+# Lookup for make_check(), type name -> check class
+CHECK_TYPES = {check.type_name: check for check in (SubstringCheck, RegexCheck, JsonFieldCheck)}
+
+
+def make_check(spec):
+    """
+    Builds a fresh check (they keep state) from the server list entry
+    :param spec: dict or None - {'type': str, 'value': str}
+    :return: ContentCheck or None if no check is set
+    """
+    if not spec:
+        return None
+
+    return CHECK_TYPES[spec['type']](spec['value'])
+
+
+def validate_check(spec):
+    """
+    :param spec: dict - {'type': str, 'value': str}
+    :return: str or None - error message if the check can't be used
+    """
+    if spec['type'] not in CHECK_TYPES:
+        return f"Unknown check type '{spec['type']}'"
+    if not spec['value']:
+        return "Content check needs a value"
+
+    try:
+        make_check(spec)
+    except re.error as e:
+        return f"Invalid regex: {e}"
+    return None
+
+
+def describe_check(spec):
+    """
+    :param spec: dict or None
+    :return: str - Short text for the server list
+    """
+    if not spec:
+        return "-"
+    return f"{spec['type']}: {spec['value']}"
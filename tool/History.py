@@ -0,0 +1,210 @@
+from array import array
+from collections import OrderedDict
+import math
+
+import tool.Constants as const
+
+
+class Series:
+    """
+    Check results of a single server, pre-aggregated on a fixed time grid:
+    per bucket of resolution seconds the min and max latency and whether it was ever down.
+    A ring of typed arrays (4 + 4 + 1 bytes per bucket), a week in 5 minute buckets
+    is ~18KB per server however often it gets checked, and views rebucket from these
+    instead of from every single check
+    """
+
+    def __init__(self, resolution, capacity):
+        """
+        :param resolution: float - Seconds per bucket
+        :param capacity: int - Buckets kept, the newest bucket and the capacity - 1 before it
+        """
+        self.resolution = resolution
+        self.capacity = capacity
+        # Slot of bucket number n is n % capacity, buckets without an answer have min > max
+        self.lows = array('f', [math.inf]) * capacity
+        self.highs = array('f', [-math.inf]) * capacity
+        self.downs = array('B', [0]) * capacity
+        # Newest bucket number (timestamp // resolution), -1 before the first check
+        self.newest = -1
+        # Checks ever appended, never goes down. Lets views find out what is new
+        self.total = 0
+
+    def append(self, timestamp, latency):
+        """
+        :param timestamp: float - time.time() of the check
+        :param latency: float or None - seconds, None if the server was down
+        """
+        number = int(timestamp // self.resolution)
+        # Older than anything the ring still holds
+        if number <= self.newest - self.capacity:
+            return
+
+        # Moved on, empty the slots of the buckets skipped (and the new one), they still hold old ones
+        if number > self.newest:
+            if self.newest >= 0:
+                for skipped in range(max(self.newest + 1, number - self.capacity + 1), number + 1):
+                    index = skipped % self.capacity
+                    self.lows[index] = math.inf
+                    self.highs[index] = -math.inf
+                    self.downs[index] = 0
+            self.newest = number
+
+        index = number % self.capacity
+        if latency is None:
+            self.downs[index] = 1
+        else:
+            self.lows[index] = min(self.lows[index], latency)
+            self.highs[index] = max(self.highs[index], latency)
+
+        self.total += 1
+
+    def ordered(self):
+        """
+        :return: (first bucket number, lows, highs, downs) - copies of the arrays, oldest bucket first
+        """
+        first = self.newest - self.capacity + 1
+        split = first % self.capacity
+        return (first,
+                self.lows[split:] + self.lows[:split],
+                self.highs[split:] + self.highs[:split],
+                self.downs[split:] + self.downs[:split])
+
+
+class ProbeHistory:
+    """
+    Check results per server, a Series each
+    """
+
+    def __init__(self, window=const.HISTORY_VIEW_SECONDS, resolution=const.HISTORY_RESOLUTION):
+        self.resolution = resolution
+        self.capacity = math.ceil(window / resolution)
+        # {name: Series}
+        self.series = {}
+
+    def record(self, name, timestamp, latency):
+        series = self.series.get(name)
+        if series is None:
+            series = self.series[name] = Series(self.resolution, self.capacity)
+        series.append(timestamp, latency)
+
+    def get(self, name):
+        return self.series.get(name)
+
+    def forget(self, name):
+        self.series.pop(name, None)
+
+    def restore(self, series):
+        """
+        Takes over series saved earlier (results snapshot)
+        Ones saved with another resolution or by an older version get skipped
+        :param series: {name: Series}
+        """
+        for name, saved in series.items():
+            if (getattr(saved, 'resolution', None) == self.resolution
+                    and getattr(saved, 'capacity', None) == self.capacity):
+                self.series[name] = saved
+
+
+class MinMaxBuckets:
+    """
+    Rebuckets a Series to one bucket per pixel column: min latency, max latency, any down?
+    Min/max keeps spikes and short outages visible, which averaging (or picking points) would hide.
+
+    Columns sit on a fixed time grid (column bucket = timestamp // span). Each column takes
+    the min/max of a slice of the Series buckets, O(width) slices, not O(checks).
+    The result is kept until a new check comes in or the view moves on by a column
+    """
+
+    def __init__(self, series, width, window):
+        """
+        :param series: Series
+        :param width: int - Pixel columns
+        :param window: float - Seconds of history spread over those columns
+        """
+        self.series = series
+        self.width = max(1, width)
+        self.window = window
+        self.span = window / self.width
+
+        # Series.total and newest column bucket the result was made for
+        self.seen = None
+        self.result = []
+
+    def columns(self, now):
+        """
+        :param now: float - time.time(), the right edge of the view
+        :return: list of (column, min, max, down) - min/max are None for buckets without an answer
+        """
+        series = self.series
+        last_bucket = int(now // self.span)
+        if self.seen == (series.total, last_bucket):
+            return self.result
+        self.seen = (series.total, last_bucket)
+
+        self.result = []
+        if series.newest < 0:
+            return self.result
+
+        first, lows, highs, downs = series.ordered()
+        resolution = series.resolution
+        for column in range(self.width):
+            start = (last_bucket - (self.width - 1 - column)) * self.span
+            # The Series buckets starting in this column, or the one it lies in if they are wider
+            low_index = math.ceil(start / resolution)
+            high_index = math.ceil((start + self.span) / resolution)
+            if high_index <= low_index:
+                low_index = int(start // resolution)
+                high_index = low_index + 1
+            low_index = max(0, low_index - first)
+            high_index = min(series.capacity, high_index - first)
+            if high_index <= low_index:
+                continue
+
+            low = min(lows[low_index:high_index])
+            high = max(highs[low_index:high_index])
+            down = 1 in downs[low_index:high_index]
+            if low > high:
+                if not down:
+                    continue
+                low = high = None
+            self.result.append((column, low, high, down))
+        return self.result
+
+
+class DownsampleCache:
+    """
+    Keeps a MinMaxBuckets per server for the width it was last drawn at
+    Bounded, least recently drawn servers get dropped first
+    """
+
+    def __init__(self, history, window=const.HISTORY_VIEW_SECONDS, size=const.HISTORY_CACHE_SIZE):
+        self.history = history
+        self.window = window
+        self.size = size
+        # {name: MinMaxBuckets}
+        self.views = OrderedDict()
+
+    def columns(self, name, width, now):
+        """
+        :return: list of (column, min, max, down), see MinMaxBuckets.columns()
+        """
+        series = self.history.get(name)
+        if series is None:
+            return []
+
+        view = self.views.get(name)
+        # New width, new window or the server got removed and re-added since
+        if (view is None or view.width != width or view.window != self.window
+                or view.series is not series):
+            view = MinMaxBuckets(series, width, self.window)
+        self.views[name] = view
+        self.views.move_to_end(name)
+
+        while len(self.views) > self.size:
+            self.views.popitem(last=False)
+
+        return view.columns(now)
+
+    def forget(self, name):
+        self.views.pop(name, None)
@@ -0,0 +1,194 @@
+"""
+Logging setup, keeps log output off the GUI and probe threads
+- Loggers only put records on a queue, a background thread formats and writes them
+- Messages are formatted on that thread as well, log with %-style arguments:
+  logger.debug("Got %s", response) - never pay for the formatting of a dropped or filtered record
+- Optional JSON lines output (LOG_JSON), one object per record with any extra fields
+- Per subsystem sampling of DEBUG records (LOG_SAMPLING), e.g. 1 in 10 per-result logs
+- The queue is bounded, when the writer can't keep up records get dropped (and counted)
+  instead of blocking whoever logged them
+"""
+
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import tool.Constants as const
+
+# Attributes every LogRecord has, anything else got passed through extra= and goes into the JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# The running listener and the handler feeding it, set up once by setup_logging()
+_listener = None
+_handler = None
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records on the queue as they are, QueueHandler would format them on the calling thread first
+    Everything stays in this process, nothing needs to be pickled
+    Arguments are formatted later, so don't change an object after passing it to a log call
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block the GUI or a probe thread on logging
+            self.dropped += 1
+
+
+class _WriterListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The one put that may wait, on exit, for the writer to make room
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through 1 in every n DEBUG records per subsystem (logger name prefix)
+    INFO and up always pass
+    """
+
+    def __init__(self, sampling):
+        """
+        :param sampling: dict - {logger name prefix: share of DEBUG records to keep (0-1)}
+        """
+        super().__init__()
+        # Longest prefix first, the most specific one wins
+        self.every = sorted(((prefix, max(1, round(1 / rate)) if rate > 0 else 0)
+                             for prefix, rate in sampling.items()), key=lambda item: -len(item[0]))
+        # {prefix: records seen}
+        self.counts = {}
+        # {logger name: (prefix, every) or None}, resolved once per logger
+        self.rules = {}
+
+    def rule(self, name):
+        rule = self.rules.get(name, False)
+        if rule is False:
+            rule = next(((prefix, every) for prefix, every in self.every
+                         if name == prefix or name.startswith(prefix + ".")), None)
+            self.rules[name] = rule
+        return rule
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+
+        rule = self.rule(record.name)
+        if rule is None:
+            return True
+
+        prefix, every = rule
+        if every == 0:
+            return False
+
+        count = self.counts.get(prefix, 0)
+        self.counts[prefix] = count + 1
+        return count % every == 0
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One JSON object per record, extra= fields included as they are
+    """
+
+    def format(self, record):
+        line = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                line[key] = value
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(line, default=str)
+
+
+def setup_logging(level=None, filename=None, json_lines=None, sampling=None):
+    """
+    Sends everything logged through the root logger over the queue to a background writer
+    Only does something the first time it gets called
+    :param level: int - defaults to DEBUG in DEBUG_MODE, else INFO
+    :param filename: str - log file, defaults to DEBUG_FILE if DEBUG_OUT is set, else the console
+    :param json_lines: bool - JSON lines instead of the text format, defaults to LOG_JSON
+    :param sampling: dict - see SamplingFilter, defaults to LOG_SAMPLING
+    :return: QueueListener
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+
+    if level is None:
+        level = logging.DEBUG if const.DEBUG_MODE else logging.INFO
+    if filename is None and const.DEBUG_OUT:
+        filename = const.DEBUG_FILE
+    if json_lines is None:
+        json_lines = const.LOG_JSON
+    if sampling is None:
+        sampling = const.LOG_SAMPLING
+
+    # The only handler that does real work, runs on the listener's thread
+    if filename:
+        writer = logging.FileHandler(filename, mode="w+", encoding="utf-8")
+    else:
+        writer = logging.StreamHandler()
+    if json_lines:
+        writer.setFormatter(JsonLinesFormatter())
+    else:
+        writer.setFormatter(logging.Formatter(const.LOGGER_FORMAT, const.LOGGER_DATE_FORMAT))
+
+    log_queue = queue.Queue(maxsize=const.LOG_QUEUE_SIZE)
+    _handler = LazyQueueHandler(log_queue)
+    if sampling:
+        _handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+
+    _listener = _WriterListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+
+    # Whatever is still queued gets written on exit
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """
+    Writes out everything still queued and stops the background writer
+    """
+    global _listener, _handler
+    if _listener is None:
+        return
+
+    logging.getLogger().removeHandler(_handler)
+    _listener.stop()
+
+    # Straight to the writer, the queue is what ran full
+    if _handler.dropped:
+        record = logging.makeLogRecord({'name': "tool.LogHandler", 'levelno': logging.WARNING,
+                                        'levelname': "WARNING",
+                                        'msg': "Dropped %d log records, the writer could not keep up",
+                                        'args': (_handler.dropped,)})
+        for writer in _listener.handlers:
+            writer.handle(record)
+
+    _listener = None
+    _handler = None
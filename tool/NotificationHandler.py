@@ -1,6 +1,7 @@
-from plyer import notification as notify
-
 def notification(old_status, new_status, server):
+    # Imported on first use, plyer is slow to import and only needed once a status changes
+    from plyer import notification as notify
+
     notify.notify(
         title=f"{server} - Status change!",
         message=f"Old status: {old_status} | New status: {new_status}",
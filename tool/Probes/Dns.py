@@ -0,0 +1,139 @@
+import random
+import selectors
+import socket
+import struct
+import time
+
+from tool.Probes import register
+from tool.Probes.Executor import SelectorExecutor, family_name
+from tool.Scheduler import probe_host
+
+# Record types that can be asked for in the url
+RECORD_TYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "MX": 15, "TXT": 16, "AAAA": 28}
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+
+def parse_target(url):
+    """
+    DNS checks take the url as server[/name[/type]]
+    "8.8.8.8/example.com/AAAA" - ask 8.8.8.8 for the AAAA records of example.com
+    "8.8.8.8" - ask for the NS records of the root zone
+    :return: (str, str, int) - server, name, record type
+    """
+    parts = url.strip().split("/")
+    name = parts[1] if len(parts) > 1 and parts[1] else "."
+    record = parts[2].upper() if len(parts) > 2 and parts[2] else ("NS" if name == "." else "A")
+    if record not in RECORD_TYPES:
+        raise ValueError(f"Unknown record type '{record}', use one of {', '.join(RECORD_TYPES)}")
+    return probe_host(parts[0]), name, RECORD_TYPES[record]
+
+
+def build_query(query_id, name, record_type):
+    """
+    :return: bytes - a standard recursive query with a single question
+    """
+    # id, flags (recursion desired), 1 question, no answer/authority/additional records
+    packet = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)
+    for label in name.strip(".").split("."):
+        if label:
+            encoded = label.encode("idna")
+            if len(encoded) > 63:
+                raise ValueError(f"DNS label too long: {label}")
+            packet += bytes([len(encoded)]) + encoded
+    return packet + b"\0" + struct.pack("!HH", record_type, 1)
+
+
+@register
+class DnsExecutor(SelectorExecutor):
+    """
+    Sends a DNS query and waits for the answer, up if the server answers NOERROR
+    Every query goes out over a single UDP socket (per address family), answers are
+    matched to their check by query id and server address
+    """
+    name = "dns"
+    title = "DNS query"
+    order = 40
+    default_port = 53
+    socktype = socket.SOCK_DGRAM
+
+    def __init__(self, done, logger=None):
+        # Created on the loop thread when first needed, {family: socket}
+        self.sockets = {}
+        # Queries waiting for an answer, {(family, query id): probe}
+        self.queries = {}
+
+        super().__init__(done, logger)
+
+    @classmethod
+    def validate(cls, url):
+        try:
+            _, name, record_type = parse_target(url)
+            build_query(0, name, record_type)
+        except (ValueError, UnicodeError) as ex:
+            return str(ex)
+        return None
+
+    @staticmethod
+    def target_host(probe):
+        return parse_target(probe.url)[0]
+
+    def shared_socket(self, family):
+        sock = self.sockets.get(family)
+        if sock is None:
+            sock = self.sockets[family] = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            self.watch(None, sock, selectors.EVENT_READ, self.on_read)
+        return sock
+
+    def start(self, probe):
+        _, name, record_type = parse_target(probe.url)
+        family, _, _, _, address = probe.addresses[0]
+
+        query_id = random.getrandbits(16)
+        while (family, query_id) in self.queries:
+            query_id = random.getrandbits(16)
+
+        sock = self.shared_socket(family)
+        sock.sendto(build_query(query_id, name, record_type), address)
+
+        probe.query = (family, query_id)
+        probe.server = address[:2]
+        self.queries[probe.query] = probe
+
+    def on_read(self, _, mask):
+        # Several answers can be waiting, read until the socket is empty
+        for family, sock in self.sockets.items():
+            while True:
+                try:
+                    data, address = sock.recvfrom(65535)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except (ConnectionRefusedError, ConnectionResetError):
+                    # ICMP error for one of the queries (a reset on Windows), each read takes
+                    # one off the socket and it is fine otherwise. That query times out
+                    continue
+                except OSError as ex:
+                    # Anything else won't go away by reading again (socket closed, ...)
+                    if self.logger is not None:
+                        self.logger.debug("Caught exception - dns shared socket read\n\t- %r", ex)
+                    break
+                self.answer(family, data, address)
+
+    def answer(self, family, data, address):
+        if len(data) < 12:
+            return
+        query_id, flags = struct.unpack("!HH", data[:4])
+
+        probe = self.queries.get((family, query_id))
+        # Not an answer, or from someone else than the server that was asked
+        if probe is None or not flags & 0x8000 or tuple(address[:2]) != tuple(probe.server):
+            return
+
+        del self.queries[probe.query]
+        rcode = RCODES.get(flags & 0xF, str(flags & 0xF))
+        self.respond(probe, f"DNS {rcode}", family_name(family), rcode == "NOERROR",
+                     time.perf_counter() - probe.started)
+
+    def expire(self, probe):
+        self.queries.pop(getattr(probe, "query", None), None)
+        super().expire(probe)
@@ -0,0 +1,345 @@
+"""
+Base classes for the probe executors
+- PoolExecutor: blocking checks on a small thread pool
+- SelectorExecutor: non-blocking sockets, every check of the type on one thread and one selector
+
+Executors are Qt free, finished checks go to the done(probe, response) callback,
+which gets called from the executor's own thread(s)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import heapq
+import queue
+import selectors
+import socket
+import threading
+import time
+
+import tool.Constants as const
+from tool.Probes import TIMED_OUT, Probe
+from tool.Scheduler import probe_host
+
+# connect_ex() results that mean the connection is on its way
+CONNECT_PENDING = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, "WSAEWOULDBLOCK", 10035)}
+
+# Name lookups for hostnames block, they run here so a slow DNS server can't stall a selector loop
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def resolver():
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ThreadPoolExecutor(max_workers=const.RESOLVER_THREADS,
+                                           thread_name_prefix="ProbeResolver")
+        return _resolver
+
+
+def make_response(probe, status, address, up, latency=None):
+    """
+    :param probe: Probe
+    :param status: str - shown in the status table, changes trigger notifications so keep it stable
+    :param address: str - "IPv4"/"IPv6" or a short reason why there is none
+    :param up: bool
+    :param latency: float or None - seconds, only for checks that got an answer
+    :return: dict - the response format the rest of the tool works with
+    """
+    return {"status": status,
+            "ipv4/6": address,
+            "port": probe.port,
+            "url": probe.url,
+            "is_web": probe.type == "http",
+            "type": probe.type,
+            "up": up,
+            "latency": latency
+            }
+
+
+def family_name(family):
+    return "IPv6" if family == socket.AF_INET6 else "IPv4"
+
+
+class ProbeExecutor:
+    """
+    Runs all checks of one probe type
+    Subclasses set the class attributes and implement submit()
+    """
+    # Key in PROBE_TYPES and in the server settings
+    name = None
+    # Shown in the UI
+    title = None
+    # Position in the UI's list of types, lowest first
+    order = 100
+    # Filled in the port field when the type gets picked
+    default_port = None
+    # Supports ContentCheck
+    content_checks = False
+
+    def __init__(self, done, logger=None):
+        """
+        :param done: callable(Probe, dict) - gets every finished check
+        :param logger: logging.Logger
+        """
+        self.done = done
+        self.logger = logger
+
+    @classmethod
+    def validate(cls, url):
+        """
+        :param url: str - as entered in the add server form
+        :return: str or None - why this type can't check the url, None if it can
+        """
+        return None
+
+    def submit(self, probe):
+        """
+        Starts a check, returns right away
+        :param probe: Probe
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def respond(self, probe, status, address, up, latency=None):
+        """
+        Check finished, hands the response on (once)
+        """
+        if probe.finished:
+            return
+        probe.finished = True
+        self.done(probe, make_response(probe, status, address, up, latency))
+
+    def unknown_exception(self, probe, ex):
+        if self.logger is not None:
+            self.logger.debug("Caught exception - %s probe %s\n\t- %r", self.name, probe.name, ex)
+        self.respond(probe, "Unknown exception", "Unknown exception", False)
+
+
+class PoolExecutor(ProbeExecutor):
+    """
+    For checks that can only be done blocking, check() runs on one of `workers` threads
+    """
+    workers = const.POOL_WORKERS
+
+    def __init__(self, done, logger=None):
+        super().__init__(done, logger)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"Probe-{self.name}")
+
+    def submit(self, probe):
+        self.pool.submit(self.run, probe)
+
+    def run(self, probe):
+        try:
+            self.check(probe)
+        except Exception as ex:
+            self.unknown_exception(probe, ex)
+
+    def check(self, probe):
+        """
+        Runs the check and calls respond()
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        self.pool.shutdown(wait=False)
+
+
+class SelectorExecutor(ProbeExecutor):
+    """
+    Event loop for non-blocking checks, one thread no matter how many checks are running
+    Subclasses implement start(probe), called on the loop thread once the address is resolved,
+    and register their sockets with watch(probe, sock, events, handler). handler(probe, mask) runs on
+    the loop thread as well. Checks still running at their deadline go to expire(probe)
+    """
+    # Socket type to resolve addresses for
+    socktype = socket.SOCK_STREAM
+    # Status of checks that ran into their timeout
+    timeout_status = TIMED_OUT
+
+    def __init__(self, done, logger=None):
+        super().__init__(done, logger)
+        self.selector = selectors.DefaultSelector()
+
+        # Work for the loop thread, from other threads, with a byte on the wakeup socket to get its attention
+        self.inbox = queue.Queue()
+        self.wakeup_read, self.wakeup_write = socket.socketpair()
+        self.wakeup_read.setblocking(False)
+        self.wakeup_write.setblocking(False)
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ, None)
+
+        # Heap of (deadline, probe id, probe), finished probes are skipped when they come up
+        self.deadlines = []
+
+        self.stopped = False
+        self.thread = threading.Thread(target=self.loop, name=f"Probe-{self.name}", daemon=True)
+        self.thread.start()
+
+    # == Any thread ==
+    def call_soon(self, callback, *args):
+        """
+        Runs callback(*args) on the loop thread
+        """
+        self.inbox.put((callback, args))
+        try:
+            self.wakeup_write.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            # Buffer full, the loop has plenty of wakeups to go through already
+            pass
+
+    def submit(self, probe):
+        host = self.target_host(probe)
+
+        # IP addresses need no lookup, only hostnames go through the resolver threads
+        try:
+            addresses = socket.getaddrinfo(host, probe.port, type=self.socktype, flags=socket.AI_NUMERICHOST)
+        except socket.gaierror:
+            resolver().submit(self.resolve, probe, host)
+        else:
+            self.call_soon(self.begin, probe, addresses, None)
+
+    def resolve(self, probe, host):
+        try:
+            addresses = socket.getaddrinfo(host, probe.port, type=self.socktype)
+        except (socket.gaierror, UnicodeError) as ex:
+            self.call_soon(self.begin, probe, None, ex)
+        else:
+            self.call_soon(self.begin, probe, addresses, None)
+
+    def stop(self):
+        self.call_soon(self.shutdown)
+
+    @staticmethod
+    def target_host(probe):
+        """
+        :return: str - the host part of the probe's url, what gets resolved
+        """
+        return probe_host(probe.url)
+
+    # == Loop thread ==
+    def begin(self, probe, addresses, error):
+        if error is not None:
+            self.respond(probe, "Offline", "None", False)
+            return
+
+        probe.addresses = list(addresses)
+        probe.started = time.perf_counter()
+        probe.deadline = probe.started + probe.timeout
+        heapq.heappush(self.deadlines, (probe.deadline, probe.id, probe))
+
+        try:
+            self.start(probe)
+        except Exception as ex:
+            self.unknown_exception(probe, ex)
+
+    def start(self, probe):
+        raise NotImplementedError
+
+    def expire(self, probe):
+        """
+        The check ran into its timeout
+        """
+        self.respond(probe, self.timeout_status, "Timeout", False)
+
+    def watch(self, probe, sock, events, handler):
+        """
+        (Re)registers sock with the selector, handler(probe, mask) gets called once it is ready
+        """
+        try:
+            self.selector.modify(sock, events, (handler, probe))
+        except KeyError:
+            self.selector.register(sock, events, (handler, probe))
+
+    def close(self, sock):
+        if sock is None:
+            return
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def respond(self, probe, status, address, up, latency=None):
+        # A probe owns at most one socket, gone once it is done
+        self.close(probe.sock)
+        probe.sock = None
+        super().respond(probe, status, address, up, latency)
+
+    def shutdown(self):
+        self.stopped = True
+
+    def run_inbox(self):
+        try:
+            while True:
+                self.wakeup_read.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        while True:
+            try:
+                callback, args = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as ex:
+                self.loop_exception(next((arg for arg in args if isinstance(arg, Probe)), None), ex)
+
+    def loop_exception(self, probe, ex):
+        """
+        An exception got out of a callback on the loop thread, answer its check instead of losing the loop
+        :param probe: Probe or None if the callback wasn't for a single check
+        """
+        if self.logger is not None:
+            self.logger.error("Caught exception - %s loop, probe %s", self.name,
+                              probe.name if probe is not None else "-", exc_info=ex)
+        if probe is not None:
+            self.respond(probe, "Unknown exception", "Unknown exception", False)
+
+    def expire_due(self):
+        """
+        :return: float or None - seconds until the next deadline, None if there is none
+        """
+        now = time.perf_counter()
+        while self.deadlines:
+            deadline, _, probe = self.deadlines[0]
+            if probe.finished:
+                heapq.heappop(self.deadlines)
+            elif deadline <= now:
+                heapq.heappop(self.deadlines)
+                try:
+                    self.expire(probe)
+                except Exception as ex:
+                    self.loop_exception(probe, ex)
+            else:
+                return deadline - now
+        return None
+
+    def loop(self):
+        while not self.stopped:
+            timeout = self.expire_due()
+
+            for key, mask in self.selector.select(timeout):
+                if key.data is None:
+                    self.run_inbox()
+                    continue
+
+                # Sockets shared by many checks (DNS) have no probe of their own
+                handler, probe = key.data
+                if probe is not None and probe.finished:
+                    continue
+                try:
+                    handler(probe, mask)
+                except Exception as ex:
+                    if probe is not None:
+                        self.unknown_exception(probe, ex)
+                    elif self.logger is not None:
+                        self.logger.debug("Caught exception - %s shared socket\n\t- %r", self.name, ex)
+
+        for key in list(self.selector.get_map().values()):
+            key.fileobj.close()
+        self.selector.close()
+        self.wakeup_write.close()
+
@@ -0,0 +1,146 @@
+import time
+
+import tool.Constants as const
+from tool import ContentCheck
+from tool.Probes import register
+from tool.Probes.Executor import PoolExecutor
+
+
+@register
+class HttpExecutor(PoolExecutor):
+    """
+    GET request, the status code decides up/down, optionally with a content check on the body
+    requests only does blocking io, the checks share a small thread pool
+    """
+    name = "http"
+    title = "Website (HTTP)"
+    order = 20
+    default_port = 80
+    content_checks = True
+
+    def check(self, probe):
+        """
+        First it formats the given url/ip and port to a workable format
+        Then it runs a check on the given url and port, treating it as a website/http server
+        """
+
+        # Imported on first use, requests (and urllib3) add noticeably to the startup time
+        import requests
+
+        url = self.format_url(probe.url, probe.port)
+
+        # Only set once we got an answer
+        latency = None
+        up = False
+
+        # Requests requires a url to have either, 'http' or 'https' infront
+        try:
+            started = time.perf_counter()
+            req = requests.get(url, stream=True, timeout=probe.timeout)
+            latency = time.perf_counter() - started
+
+            # Get status code and description
+            status = f"[{req.status_code}] - {req.reason}"
+            up = req.ok
+
+            # Get server ip from url
+            ipv46 = self.connection_address(req)
+
+            # Optional content check, reads (part of) the body
+            check = ContentCheck.make_check(probe.content_check)
+            if check is not None:
+                passed, detail = self.read_body(req, check, probe.max_bytes or const.CONTENT_MAX_BYTES)
+                status += f" | {detail}"
+                up = up and passed
+
+            # Close connection
+            req.close()
+
+            # Lots of error handling
+        except requests.exceptions.Timeout:
+            # Request timed out
+            # Goes first, a ConnectTimeout is also a ConnectionError
+            status = "Request timed out"
+            ipv46 = "TIMEOUT"
+        except requests.exceptions.ConnectionError:
+            # Server offline or atleast, from the clients point is unable to make any connection
+            status = "OFFLINE"
+            ipv46 = "OFFLINE"
+        except requests.exceptions.TooManyRedirects:
+            # Got redirected too many times
+            status = "Redirect limit"
+            ipv46 = "REDIRECTED"
+        except requests.exceptions.RequestException as ex:
+            if self.logger is not None:
+                # If logger is set, log error message
+                self.logger.debug("Uncaught exception - HttpExecutor.check()\n\t- %s", ex)
+            status = "Unknown exception"
+            ipv46 = "Unknown exception"
+
+        self.respond(probe, status, ipv46, up, latency)
+
+    @staticmethod
+    def connection_address(req):
+        """
+        Read from urllib3's connection, which is gone already when the server closes it
+        right after the response (HTTP/1.0, Connection: close)
+        :param req: requests.Response
+        :return: str - ip address, "-" if the connection is gone
+        """
+        sock = getattr(getattr(req.raw, "_connection", None), "sock", None)
+        if sock is None:
+            return "-"
+        return sock.getsockname()[0]
+
+    @staticmethod
+    def read_body(req, check, max_bytes):
+        """
+        Streams the body into the content check until it has its answer
+        or max_bytes have been read, the rest of the body is never downloaded
+        :param req: requests.Response - opened with stream=True
+        :param check: ContentCheck
+        :param max_bytes: int
+        :return: (bool, str) - passed, description
+        """
+        received = 0
+        truncated = False
+
+        for chunk in req.iter_content(chunk_size=const.CONTENT_CHUNK_SIZE):
+            if received + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - received]
+                truncated = True
+            received += len(chunk)
+
+            if check.feed(chunk) or truncated:
+                break
+
+        return check.finish(truncated)
+
+    @staticmethod
+    def format_url(url, port):
+        """
+        Formats the given url and port so it is valid for the requests.get()
+        :param url: str
+        :param port: int
+        :return: new_url -> str
+        """
+        new_url = ""
+        url_s = url.split("/")
+
+        if "://" in url:
+            # Get rid of first 2 items in list ("http:", "")
+            # Not just "http" in url, hosts like httpbin.org would match that
+            http = url_s[0].rstrip(":")    # we require http later, save it so we know what the user provided (http, https)
+            url_s = url_s[2:]
+        else:
+            http = "http"
+
+        new_url = url_s[0] + f":{port}"
+
+        # The url had sub-dirs after the part where we place our port
+        if len(url_s) > 1:
+            new_url += "/"
+            new_url += "/".join(url_s[1:])
+
+        # Prepend the http(s) to the url again and return
+        return http + "://" + new_url
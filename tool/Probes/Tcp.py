@@ -0,0 +1,71 @@
+import errno
+import selectors
+import socket
+import time
+
+from tool.Probes import register
+from tool.Probes.Executor import SelectorExecutor, CONNECT_PENDING, family_name
+
+
+@register
+class TcpExecutor(SelectorExecutor):
+    """
+    Opens (and closes) a plain TCP connection
+    All connects are non-blocking on one selector, no thread per check
+    Tries every address the host resolves to, like socket.create_connection()
+    """
+    name = "tcp"
+    title = "TCP connect"
+    order = 10
+    default_port = 80
+    # Kept from before there were probe types, a changed status would notify
+    timeout_status = "Unknown/Timed out"
+
+    def start(self, probe):
+        self.connect_next(probe)
+
+    def connect_next(self, probe, error=None):
+        """
+        Connects to the next address of the probe, responds once there are none left
+        :param error: int - errno of the address that just failed
+        """
+        if not probe.addresses:
+            self.connect_failed(probe, error)
+            return
+
+        family, socktype, proto, _, address = probe.addresses.pop(0)
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(False)
+        probe.sock = sock
+
+        result = sock.connect_ex(address)
+        if result not in CONNECT_PENDING:
+            self.close(sock)
+            probe.sock = None
+            self.connect_next(probe, result)
+            return
+
+        self.watch(probe, sock, selectors.EVENT_WRITE, self.on_connect)
+
+    def on_connect(self, probe, mask):
+        sock = probe.sock
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            self.close(sock)
+            probe.sock = None
+            self.connect_next(probe, error)
+            return
+
+        self.connected(probe, time.perf_counter() - probe.started)
+
+    def connected(self, probe, latency):
+        """
+        TCP connection is up, subclasses carry on from here
+        """
+        self.respond(probe, "Online", family_name(probe.sock.family), True, latency)
+
+    def connect_failed(self, probe, error):
+        if error in (errno.ECONNREFUSED, getattr(errno, "WSAECONNREFUSED", 10061)):
+            self.respond(probe, "Refused", "Connection refused", False)
+        else:
+            self.respond(probe, "Offline", "None", False)
@@ -0,0 +1,71 @@
+import selectors
+import time
+
+import tool.Constants as const
+from tool.Probes import register, TIMED_OUT
+from tool.Probes.Executor import family_name
+from tool.Probes.Tcp import TcpExecutor
+
+
+@register
+class TlsExecutor(TcpExecutor):
+    """
+    TCP connect followed by a TLS handshake, the certificate has to verify for the host
+    Up while the certificate is valid, the status warns once it expires within TLS_EXPIRY_WARN_DAYS
+    Handshakes are non-blocking on the same kind of selector loop as the TCP checks
+    """
+    name = "tls"
+    title = "TLS handshake"
+    order = 30
+    default_port = 443
+    timeout_status = TIMED_OUT
+
+    def __init__(self, done, logger=None):
+        # Only needed once someone checks a TLS server
+        import ssl
+        self.ssl = ssl
+        self.context = ssl.create_default_context()
+
+        super().__init__(done, logger)
+
+    def connected(self, probe, latency):
+        sock = probe.sock
+        self.selector.unregister(sock)
+
+        probe.sock = self.context.wrap_socket(sock, server_hostname=self.target_host(probe),
+                                              do_handshake_on_connect=False)
+        self.handshake(probe, selectors.EVENT_WRITE)
+
+    def handshake(self, probe, mask):
+        ssl = self.ssl
+        sock = probe.sock
+
+        try:
+            sock.do_handshake()
+        except ssl.SSLWantReadError:
+            self.watch(probe, sock, selectors.EVENT_READ, self.handshake)
+            return
+        except ssl.SSLWantWriteError:
+            self.watch(probe, sock, selectors.EVENT_WRITE, self.handshake)
+            return
+        except ssl.SSLCertVerificationError as ex:
+            self.respond(probe, f"Certificate error - {ex.verify_message}", family_name(sock.family), False)
+            return
+        except (ssl.SSLError, OSError) as ex:
+            reason = getattr(ex, "reason", None) or type(ex).__name__
+            self.respond(probe, f"TLS error - {reason}", family_name(sock.family), False)
+            return
+
+        latency = time.perf_counter() - probe.started
+
+        # Verified, so the certificate is there and has a notAfter
+        expires = ssl.cert_time_to_seconds(sock.getpeercert()['notAfter'])
+        days_left = (expires - time.time()) / 86400
+
+        # Days left stay out of the status, it would change (and notify) every day
+        if days_left < const.TLS_EXPIRY_WARN_DAYS:
+            status = f"TLS OK, certificate expires soon - {sock.version()}"
+        else:
+            status = f"TLS OK - {sock.version()}"
+
+        self.respond(probe, status, family_name(sock.family), True, latency)
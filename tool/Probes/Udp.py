@@ -0,0 +1,53 @@
+import selectors
+import socket
+import time
+
+from tool.Probes import register
+from tool.Probes.Executor import SelectorExecutor, family_name
+
+
+@register
+class UdpExecutor(SelectorExecutor):
+    """
+    UDP echo (RFC 862), sends a datagram and expects the same bytes back
+    No answer looks the same as a server that is down, both end up as timed out.
+    A closed port usually answers with an ICMP port unreachable, reported as refused
+    """
+    name = "udp"
+    title = "UDP echo"
+    order = 50
+    default_port = 7
+    socktype = socket.SOCK_DGRAM
+
+    @staticmethod
+    def payload(probe):
+        # Unique per check, a late echo of an earlier check can't pass for this one
+        return f"ConnectionTool echo {probe.id}".encode()
+
+    def start(self, probe):
+        family, socktype, proto, _, address = probe.addresses[0]
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(False)
+        probe.sock = sock
+
+        # Connected, so only datagrams from the server arrive and ICMP errors get reported
+        sock.connect(address)
+        sock.send(self.payload(probe))
+        self.watch(probe, sock, selectors.EVENT_READ, self.on_read)
+
+    def on_read(self, probe, mask):
+        sock = probe.sock
+        try:
+            data = sock.recv(65535)
+        except (ConnectionRefusedError, ConnectionResetError):
+            # Windows reports the ICMP port unreachable as a reset
+            self.respond(probe, "Refused", "Connection refused", False)
+            return
+        except (BlockingIOError, InterruptedError):
+            return
+
+        latency = time.perf_counter() - probe.started
+        if data == self.payload(probe):
+            self.respond(probe, "Echo OK", family_name(sock.family), True, latency)
+        else:
+            self.respond(probe, "Echo mismatch", family_name(sock.family), False, latency)
@@ -0,0 +1,98 @@
+"""
+Probe types, what kind of check runs against a server
+Each type is a ProbeExecutor subclass (see Executor.py) that runs all checks of its kind,
+batched its own way: TCP/TLS/UDP share one selector loop per type, DNS multiplexes every
+query over a single UDP socket, HTTP uses a small thread pool (requests is blocking).
+
+Adding a protocol: drop a module with an executor class decorated with @register into this
+package, every module in it gets imported on startup. Nothing else needs to change
+"""
+
+import importlib
+import itertools
+import pkgutil
+
+# Status for checks that ran into their timeout, new probe types should use this one
+TIMED_OUT = "Timed out"
+
+# {name: ProbeExecutor subclass}, sorted by their order attribute (shown like that in the UI)
+PROBE_TYPES = {}
+
+# Unique probe ids, the executors match answers to probes with them
+_probe_ids = itertools.count(1)
+
+
+def register(executor_class):
+    """
+    Class decorator, makes a probe type available under executor_class.name
+    """
+    PROBE_TYPES[executor_class.name] = executor_class
+    return executor_class
+
+
+def probe_type(server):
+    """
+    :param server: dict - server settings, from self.servers
+    :return: str - name of its probe type, servers saved before there were types fall back to tcp/http
+    """
+    return server.get('type') or ("http" if server.get('web') else "tcp")
+
+
+class Probe:
+    """
+    A single check, handed to the executor of its type
+    """
+
+    def __init__(self, name, type_name, url, port, timeout, retry_timeout=None,
+                 content_check=None, max_bytes=None):
+        """
+        :param name: str - returned with the response, identifies the check to whoever started it
+        :param type_name: str - key into PROBE_TYPES
+        :param url: str - as entered by the user, each type reads it its own way
+        :param port: int
+        :param timeout: float - seconds
+        :param retry_timeout: float - if set, a check that timed out gets one more try with this timeout
+        :param content_check: dict - http only, see ContentCheck
+        :param max_bytes: int - http only, stop reading the body after this many bytes
+        """
+        self.id = next(_probe_ids)
+        self.name = name
+        self.type = type_name
+        self.url = url
+        self.port = int(port)
+        self.timeout = timeout
+        self.retry_timeout = retry_timeout
+        self.content_check = content_check
+        self.max_bytes = max_bytes
+        self.retried = False
+
+        # Used by the executor while the check runs
+        self.started = None
+        self.deadline = None
+        self.addresses = []
+        self.sock = None
+        self.finished = False
+
+    def retry(self):
+        """
+        :return: Probe - the same check once more, with the retry timeout
+        """
+        probe = Probe(self.name, self.type, self.url, self.port, self.retry_timeout,
+                      content_check=self.content_check, max_bytes=self.max_bytes)
+        probe.retried = True
+        return probe
+
+
+def load_probe_types():
+    """
+    Imports every module in this package, the executors in them register themselves
+    """
+    for module in pkgutil.iter_modules(__path__):
+        importlib.import_module(f"{__name__}.{module.name}")
+
+    ordered = sorted(PROBE_TYPES.values(), key=lambda executor: (executor.order, executor.name))
+    PROBE_TYPES.clear()
+    PROBE_TYPES.update((executor.name, executor) for executor in ordered)
+
+
+load_probe_types()
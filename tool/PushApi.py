@@ -0,0 +1,429 @@
+"""
+Local push API, streams live status to other tools over loopback HTTP
+Off unless push_api_port is set in the config. Endpoints:
+
+- GET /events  - server-sent events (text/event-stream), for EventSource and friends
+- GET /stream  - newline delimited JSON, one event per line
+- GET /status  - the current status of every server as a single JSON object
+
+Streams start with a snapshot event, then get:
+- status: a server changed status (or got its first result), {"server", "old", "status", "up", "latency", "time"}
+- latency: every PUSH_BATCH_INTERVAL seconds, all results since the last batch, "samples": [[server, latency, up], ...]
+- removed: a server got deleted
+- dropped: this many events got missed, the subscriber fell behind or the API itself did, time to re-read /status
+
+The GUI thread only appends results to a queue (publish()), everything else happens on the
+API's own thread: one selector for every subscriber, events get encoded once per format.
+Each subscriber has its own bounded queue, a slow one misses events instead of holding anybody up.
+The results queue is bounded too, if it overflows the statuses catch up from the latest result
+per server, which the GUI thread keeps next to it
+"""
+
+from collections import deque
+import json
+import selectors
+import socket
+import threading
+import time
+
+import tool.Constants as const
+
+_HEADERS = ("HTTP/1.1 {status}\r\n"
+            "Content-Type: {content_type}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "\r\n")
+
+# {path: (format, content type)}
+_STREAMS = {
+    "/events": ("sse", "text/event-stream"),
+    "/stream": ("ndjson", "application/x-ndjson"),
+}
+
+
+class Subscriber:
+    """
+    A single connection, reading its request or streaming events
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.connected = time.monotonic()
+        self.request = b""
+
+        # "sse" or "ndjson" once it streams
+        self.format = None
+
+        # Encoded events waiting to be sent, and what is left of the one being sent
+        self.queue = deque()
+        self.out = None
+        # Events missed since the queue was last full
+        self.dropped = 0
+        self.writing = False
+        self.close_when_sent = False
+
+
+class PushServer:
+    """
+    Loopback HTTP server pushing status changes and latency batches to its subscribers
+    """
+
+    def __init__(self, port, host=const.PUSH_HOST, logger=None):
+        """
+        :param port: int - 0 picks a free port, see self.port
+        :param host: str - loopback only by default, there is no authentication
+        :param logger: logging.Logger
+        """
+        self.logger = logger
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self.port = self.listener.getsockname()[1]
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ, "listen")
+
+        # Results from the GUI thread, (name, status, up, latency, time) - status None means removed
+        self.results = deque(maxlen=const.PUSH_INBOX_SIZE)
+        # Latest result per server, {name: (name, status, up, latency, time)}, for when results overflows
+        self.latest = {}
+        # Results pushed out of the full queue, only ever goes up (GUI thread) / how many got handled (API thread)
+        self.overflowed = 0
+        self.overflow_handled = 0
+        # Set while a wakeup byte is on its way, saves a send() per result
+        self.wake_pending = False
+        self.wakeup_read, self.wakeup_write = socket.socketpair()
+        self.wakeup_read.setblocking(False)
+        self.wakeup_write.setblocking(False)
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ, "wakeup")
+
+        # Everything below is only touched on the API thread
+        # {socket: Subscriber}
+        self.subscribers = {}
+        # Subscribers that stream, no latency batches get collected without any
+        self.streaming = 0
+        # Last known status per server, {name: {'status': str, 'up': bool, 'since': float}}
+        self.statuses = {}
+        # Latency samples for the next batch, [[name, latency, up], ...]
+        self.latencies = []
+
+        self.stopped = False
+        self.thread = threading.Thread(target=self.loop, name="PushApi", daemon=True)
+        self.thread.start()
+
+    # == GUI thread ==
+    def publish(self, name, response):
+        """
+        Hands a result to the API, never blocks
+        :param name: str - server name
+        :param response: dict - as handed to server_response
+        """
+        result = (name, response['status'], response.get('up'), response.get('latency'), time.time())
+        self.latest[name] = result
+        self.append(result)
+
+    def remove(self, name):
+        self.latest.pop(name, None)
+        self.append((name, None, None, None, time.time()))
+
+    def append(self, result):
+        # Full, appending pushes the oldest result out
+        if len(self.results) == self.results.maxlen:
+            self.overflowed += 1
+        self.results.append(result)
+        self.wake()
+
+    def wake(self):
+        if self.wake_pending:
+            return
+        self.wake_pending = True
+        try:
+            self.wakeup_write.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def stop(self):
+        self.stopped = True
+        self.wake_pending = False
+        self.wake()
+        self.thread.join()
+
+    # == API thread ==
+    def loop(self):
+        next_flush = time.monotonic() + const.PUSH_BATCH_INTERVAL
+        next_heartbeat = time.monotonic() + const.PUSH_HEARTBEAT
+
+        while not self.stopped:
+            timeout = max(0.0, min(next_flush, next_heartbeat) - time.monotonic())
+            for key, mask in self.selector.select(timeout):
+                if key.data == "wakeup":
+                    self.wake_up()
+                elif key.data == "listen":
+                    self.accept()
+                else:
+                    self.handle(key.data, mask)
+
+            now = time.monotonic()
+            if now >= next_flush:
+                self.drain_results()
+                self.flush_latencies()
+                next_flush = now + const.PUSH_BATCH_INTERVAL
+            if now >= next_heartbeat:
+                self.heartbeat(now)
+                next_heartbeat = now + const.PUSH_HEARTBEAT
+
+        for subscriber in list(self.subscribers.values()):
+            self.close(subscriber)
+        self.selector.close()
+        self.listener.close()
+        self.wakeup_read.close()
+        self.wakeup_write.close()
+
+    def wake_up(self):
+        try:
+            while self.wakeup_read.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        # Cleared before draining, a result appended after this wakes the loop again
+        self.wake_pending = False
+        self.drain_results()
+
+    def drain_results(self):
+        results = self.results
+        while results:
+            name, status, up, latency, when = results.popleft()
+
+            if status is None:
+                if self.statuses.pop(name, None) is not None:
+                    self.broadcast({'type': "removed", 'server': name, 'time': when})
+                continue
+
+            self.update_status(name, status, up, latency, when)
+
+            if self.streaming:
+                self.latencies.append([name, latency, up])
+
+        if self.overflowed != self.overflow_handled:
+            self.catch_up()
+
+    def catch_up(self):
+        """
+        Results got pushed out of the full queue, brings the statuses up to date
+        with the latest result per server and tells every subscriber what it missed
+        """
+        overflowed = self.overflowed
+        missed = overflowed - self.overflow_handled
+        self.overflow_handled = overflowed
+        if self.logger is not None:
+            self.logger.warning("Push API fell behind, %d results dropped", missed)
+
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.format is not None:
+                subscriber.dropped += missed
+                if not subscriber.writing:
+                    self.write(subscriber)
+
+        # Copied in one go, the GUI thread keeps changing it
+        latest = self.latest.copy()
+        for name in self.statuses.keys() - latest.keys():
+            del self.statuses[name]
+            self.broadcast({'type': "removed", 'server': name, 'time': time.time()})
+
+        for name, status, up, latency, when in latest.values():
+            self.update_status(name, status, up, latency, when)
+
+    def update_status(self, name, status, up, latency, when):
+        """
+        Keeps the status of a server, tells the subscribers if it changed
+        """
+        old = self.statuses.get(name)
+        if old is None or old['status'] != status or old['up'] != up:
+            self.statuses[name] = {'status': status, 'up': up, 'since': when}
+            self.broadcast({'type': "status", 'server': name, 'time': when,
+                            'old': old['status'] if old else None,
+                            'status': status, 'up': up, 'latency': latency})
+
+    def flush_latencies(self):
+        if not self.latencies:
+            return
+        self.broadcast({'type': "latency", 'time': time.time(), 'samples': self.latencies})
+        self.latencies = []
+
+    def heartbeat(self, now):
+        # Keeps proxies from closing idle streams, and finds subscribers that went away
+        self.broadcast({'type': "heartbeat", 'time': time.time()}, sse_comment=True)
+
+        # Connections that never finished their request
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.format is None and now - subscriber.connected > const.PUSH_HEARTBEAT:
+                self.close(subscriber)
+
+    @staticmethod
+    def encode(event, stream_format, sse_comment=False):
+        data = json.dumps(event, separators=(",", ":"), default=str)
+        if stream_format == "ndjson":
+            return (data + "\n").encode()
+        if sse_comment:
+            return b": heartbeat\n\n"
+        return f"event: {event['type']}\ndata: {data}\n\n".encode()
+
+    def broadcast(self, event, sse_comment=False):
+        if not self.streaming:
+            return
+
+        # Encoded once per format, not once per subscriber
+        encoded = {}
+        for subscriber in list(self.subscribers.values()):
+            if subscriber.format is None:
+                continue
+            data = encoded.get(subscriber.format)
+            if data is None:
+                data = encoded[subscriber.format] = self.encode(event, subscriber.format, sse_comment)
+            self.enqueue(subscriber, data)
+
+    def enqueue(self, subscriber, data, force=False):
+        """
+        :param force: bool - skips the queue limit, for the snapshot a stream starts with
+        """
+        if not force and len(subscriber.queue) >= const.PUSH_QUEUE_SIZE:
+            subscriber.dropped += 1
+            return
+
+        if subscriber.dropped:
+            subscriber.queue.append(self.dropped_event(subscriber))
+
+        subscriber.queue.append(data)
+        if not subscriber.writing:
+            self.write(subscriber)
+
+    def dropped_event(self, subscriber):
+        event = self.encode({'type': "dropped", 'count': subscriber.dropped, 'time': time.time()}, subscriber.format)
+        subscriber.dropped = 0
+        return event
+
+    def write(self, subscriber):
+        sock = subscriber.sock
+        while subscriber.out is not None or subscriber.queue or subscriber.dropped:
+            if subscriber.out is None and not subscriber.queue:
+                # Caught up after missing events, tell it right away instead of with the next event
+                subscriber.queue.append(self.dropped_event(subscriber))
+            if subscriber.out is None:
+                subscriber.out = memoryview(subscriber.queue.popleft())
+            try:
+                sent = sock.send(subscriber.out)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                self.close(subscriber)
+                return
+
+            subscriber.out = subscriber.out[sent:] if sent < len(subscriber.out) else None
+            if subscriber.out is not None:
+                # Socket buffer full, carry on once it is writable again
+                if not subscriber.writing:
+                    subscriber.writing = True
+                    self.selector.modify(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, subscriber)
+                return
+
+        if subscriber.close_when_sent:
+            self.close(subscriber)
+        elif subscriber.writing:
+            subscriber.writing = False
+            self.selector.modify(sock, selectors.EVENT_READ, subscriber)
+
+    def accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            sock.setblocking(False)
+            subscriber = Subscriber(sock)
+            self.subscribers[sock] = subscriber
+            self.selector.register(sock, selectors.EVENT_READ, subscriber)
+
+            if len(self.subscribers) > const.PUSH_MAX_SUBSCRIBERS:
+                self.respond(subscriber, "503 Service Unavailable", {'error': "Too many subscribers"})
+
+    def handle(self, subscriber, mask):
+        if mask & selectors.EVENT_WRITE:
+            self.write(subscriber)
+            if subscriber.sock not in self.subscribers:
+                return
+
+        if not mask & selectors.EVENT_READ:
+            return
+
+        try:
+            data = subscriber.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            # Subscriber hung up
+            self.close(subscriber)
+            return
+
+        # Streaming subscribers have nothing more to say, anything they send is ignored
+        if subscriber.format is not None or subscriber.close_when_sent:
+            return
+
+        subscriber.request += data
+        if b"\r\n\r\n" in subscriber.request:
+            self.route(subscriber)
+        elif len(subscriber.request) > 8192:
+            self.respond(subscriber, "431 Request Header Fields Too Large", {'error': "Request too large"})
+
+    def route(self, subscriber):
+        request_line = subscriber.request.split(b"\r\n", 1)[0].decode("latin-1")
+        parts = request_line.split()
+        if len(parts) < 2 or parts[0] != "GET":
+            self.respond(subscriber, "405 Method Not Allowed", {'error': "Only GET is supported"})
+            return
+
+        path = parts[1].split("?", 1)[0]
+        if path == "/status":
+            self.respond(subscriber, "200 OK", self.snapshot())
+        elif path in _STREAMS:
+            stream_format, content_type = _STREAMS[path]
+            self.enqueue(subscriber, _HEADERS.format(status="200 OK", content_type=content_type).encode(), force=True)
+            subscriber.format = stream_format
+            self.streaming += 1
+            if self.logger is not None:
+                self.logger.debug("Subscriber %s streams %s", subscriber.sock.getpeername(), path)
+            self.enqueue(subscriber, self.encode(self.snapshot(), stream_format), force=True)
+        else:
+            self.respond(subscriber, "404 Not Found", {'error': "Unknown path, use /events, /stream or /status"})
+
+    def snapshot(self):
+        return {'type': "snapshot", 'time': time.time(), 'servers': self.statuses}
+
+    def respond(self, subscriber, status, body):
+        """
+        Single JSON answer, the connection closes once it is sent
+        """
+        subscriber.close_when_sent = True
+        data = _HEADERS.format(status=status, content_type="application/json").encode()
+        self.enqueue(subscriber, data + json.dumps(body, default=str).encode(), force=True)
+
+    def close(self, subscriber):
+        if self.subscribers.pop(subscriber.sock, None) is None:
+            return
+        if subscriber.format is not None:
+            self.streaming -= 1
+            if self.logger is not None:
+                self.logger.debug("Subscriber left, %d still streaming", self.streaming)
+        try:
+            self.selector.unregister(subscriber.sock)
+        except (KeyError, ValueError):
+            pass
+        subscriber.sock.close()
@@ -0,0 +1,193 @@
+"""
+Record/replay of check results
+Recording writes every result the checks hand to server_response, as they arrive, to a
+gzipped JSON lines file: a header with the server list, then one line per result
+[seconds since the recording started, [server names], response].
+Servers sharing a check share a line, like they share the worker_response emission.
+
+Replaying feeds that file back into ConnectionTool.server_response at the recorded pace,
+or faster, without a single check going out. Runs in a scratch directory so the
+real config and server list are left alone.
+
+Usage: py main.py --record incident.replay      (then use the tool as usual)
+       py main.py --replay incident.replay --speed 10
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+import tool.Constants as const
+from tool import ConfigHandler
+
+FORMAT_NAME = "connectiontool-replay"
+FORMAT_VERSION = 1
+
+
+class ResponseRecorder:
+    """
+    Writes results to a replay file while the tool runs
+    """
+
+    def __init__(self, filename, servers):
+        """
+        :param filename: str
+        :param servers: dict - the server list at the start, the replay sets it up the same way
+        """
+        self.filename = filename
+        self.file = gzip.open(filename, "wt", encoding="utf-8")
+        self.started = time.perf_counter()
+        self.count = 0
+
+        self.write({'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'recorded': time.time(),
+                    'servers': servers})
+
+    def write(self, line):
+        self.file.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+    def record(self, response, names):
+        """
+        :param response: dict - as emitted by the worker
+        :param names: list - servers that got this result
+        """
+        self.write([round(time.perf_counter() - self.started, 4), list(names), response])
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def read_replay(filename):
+    """
+    :return: (dict, list) - server list, [(offset, names, response), ...] in recorded order
+    """
+    with gzip.open(filename, "rt", encoding="utf-8") as handle:
+        header = json.loads(handle.readline())
+        if header.get('format') != FORMAT_NAME:
+            raise ValueError(f"{filename} is not a replay file")
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{filename} has version {header.get('version')}, expected {FORMAT_VERSION}")
+
+        entries = [tuple(json.loads(line)) for line in handle if line.strip()]
+    return header['servers'], entries
+
+
+class ResponseReplayer(QObject):
+    """
+    Feeds recorded results into a ConnectionTool, on the GUI thread like the real ones
+    Work is done in slices of REPLAY_SLICE seconds at most, the event loop (and painting)
+    gets its turn in between, no matter how far behind an accelerated replay is
+    """
+    finished = pyqtSignal()
+
+    def __init__(self, tool, entries, speed=1.0):
+        """
+        :param tool: ConnectionTool
+        :param entries: list - from read_replay()
+        :param speed: float - 1 = recorded pace, 10 = ten times faster, 0 = as fast as possible
+        """
+        super().__init__()
+
+        self.tool = tool
+        self.entries = entries
+        self.speed = speed
+
+        self.index = 0
+        self.started = None
+        self.applied = 0
+        # Seconds the replay fell behind the (sped up) recorded timing, worst case
+        self.max_lag = 0.0
+        # Longest single slice of work on the GUI thread
+        self.max_slice = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        QTimer.singleShot(0, self.step)
+
+    def due(self, offset):
+        """
+        :return: float - perf_counter() at which an entry recorded at offset is due
+        """
+        return self.started if self.speed <= 0 else self.started + offset / self.speed
+
+    def step(self):
+        slice_start = time.perf_counter()
+        slice_end = slice_start + const.REPLAY_SLICE
+
+        entries = self.entries
+        while self.index < len(entries):
+            offset, names, response = entries[self.index]
+            now = time.perf_counter()
+            due = self.due(offset)
+            if due > now or now > slice_end:
+                break
+
+            self.max_lag = max(self.max_lag, now - due)
+            for name in names:
+                self.tool.server_response(dict(response), name)
+                self.applied += 1
+            self.index += 1
+
+        now = time.perf_counter()
+        self.max_slice = max(self.max_slice, now - slice_start)
+
+        if self.index >= len(entries):
+            self.finished.emit()
+            return
+
+        QTimer.singleShot(max(0, int((self.due(entries[self.index][0]) - now) * 1000)), self.step)
+
+    def summary(self):
+        duration = time.perf_counter() - self.started
+        return (f"Replayed {self.index} results ({self.applied} server updates) in {duration:.2f}s "
+                f"| {self.applied / duration if duration else 0:.0f} updates/s "
+                f"| max lag {self.max_lag * 1000:.0f}ms | longest slice {self.max_slice * 1000:.0f}ms")
+
+
+def run_replay(app, filename, speed=1.0, exit_when_done=False):
+    """
+    Opens a ConnectionTool with the recorded server list and replays the file into it
+    :param app: QApplication
+    :param filename: str
+    :param speed: float - see ResponseReplayer
+    :param exit_when_done: bool - close once the replay is done, instead of leaving the window open
+    :return: int - exit code
+    """
+    # Imported here, the tool module sets up logging on import
+    from tool.tool import ConnectionTool
+
+    logger = logging.getLogger("tool.Replay")
+    servers, entries = read_replay(filename)
+
+    # Config, server list and snapshot go to a scratch directory, removed afterwards
+    with ConfigHandler.scratch_dir("connectiontool-replay-") as workdir:
+        tool = ConnectionTool(base_dir=workdir)
+        # Nothing goes out over the network, the file is the only source of results
+        # No desktop notifications either, a replayed incident would flood them
+        tool.timer.stop()
+        tool.probing = False
+        tool.notify = False
+
+        tool.servers = servers
+        tool.fill_settings_table()
+        tool.status_bar.showMessage(f"Replaying {os.path.basename(filename)} at "
+                                    f"{'full speed' if speed <= 0 else f'{speed:g}x'}")
+
+        replayer = ResponseReplayer(tool, entries, speed)
+
+        def done():
+            logger.info(replayer.summary())
+            tool.status_bar.showMessage(replayer.summary())
+            if exit_when_done:
+                tool.close()
+                app.quit()
+
+        replayer.finished.connect(done)
+        replayer.start()
+        app.exec_()
+
+    return 0
@@ -0,0 +1,198 @@
+from collections import deque
+import time
+
+
+def probe_host(url):
+    """
+    Host part of a server url/ip, what the per host limit counts by
+    "https://Example.com:8443/health" -> "example.com"
+    :param url: str
+    :return: str
+    """
+    host = url.strip().lower()
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = host.split("/", 1)[0]
+
+    # Strip a port, but leave bare IPv6 addresses alone
+    if host.startswith("["):
+        return host[1:].split("]", 1)[0]
+    if host.count(":") == 1:
+        host = host.split(":", 1)[0]
+    return host
+
+
+class TokenBucket:
+    """
+    Global rate limit for new connections
+    Fills up with rate tokens per second, holds at most burst tokens
+    """
+
+    def __init__(self, rate, burst):
+        """
+        :param rate: float - tokens per second, 0 or less means no limit
+        :param burst: int - most tokens that can be saved up
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        """
+        :return: bool - True if a token was taken, the connection may start
+        """
+        if self.rate <= 0:
+            return True
+
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now):
+        """
+        :return: float - seconds until the next token is available
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        self.refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class ProbeScheduler:
+    """
+    Decides when queued checks may start
+    - At most max_per_host checks run against the same host at once
+    - New connections start at most at the TokenBucket rate, over all hosts
+    Hosts take turns (round robin), one busy host can't hold up the others
+
+    Qt free, the caller hands in schedule(delay, callback) to get pump() called again
+    once the rate limit allows the next connection
+    """
+
+    def __init__(self, max_per_host, rate, burst, schedule):
+        """
+        :param max_per_host: int - 0 or less means no limit
+        :param rate: float - new connections per second, 0 or less means no limit
+        :param burst: int - connections that may start at once after a quiet period
+        :param schedule: callable(float, callable) - call the callback after the delay (seconds)
+        """
+        self.max_per_host = max_per_host
+        self.bucket = TokenBucket(rate, burst)
+        self.schedule = schedule
+
+        # {host: deque([start callback, ...])}
+        self.pending = {}
+        # Hosts with pending checks, in the order they get their turn
+        self.rotation = deque()
+        # {host: running checks}
+        self.active = {}
+
+        # Checks waiting to start
+        self.queued = 0
+        # A pump() is already scheduled for when the next token is in
+        self.pump_scheduled = False
+        # Guards against pump() being re-entered from a start callback
+        self.pumping = False
+        self.pump_again = False
+
+    def submit(self, host, start):
+        """
+        Queues a check, it starts as soon as the limits allow it (possibly right away)
+        :param host: str - see probe_host()
+        :param start: callable - starts the check, release(host) has to be called once it is done
+        """
+        queue = self.pending.get(host)
+        if queue is None:
+            queue = self.pending[host] = deque()
+            self.rotation.append(host)
+        queue.append(start)
+        self.queued += 1
+
+        self.pump()
+
+    def release(self, host):
+        """
+        A check against host finished, frees its slot
+        """
+        count = self.active.get(host, 0) - 1
+        if count > 0:
+            self.active[host] = count
+        else:
+            self.active.pop(host, None)
+
+        self.pump()
+
+    def host_full(self, host):
+        return 0 < self.max_per_host <= self.active.get(host, 0)
+
+    def pump(self):
+        """
+        Starts as many queued checks as the limits allow
+        A start callback can call release()/submit() right away, those don't recurse
+        into a second pump but make the running one go again
+        """
+        if self.pumping:
+            self.pump_again = True
+            return
+
+        self.pumping = True
+        try:
+            self.pump_again = True
+            while self.pump_again:
+                self.pump_again = False
+                self._pump()
+        finally:
+            self.pumping = False
+
+    def _pump(self):
+        # Each pass over the rotation gives every host at most one start
+        skipped = 0
+        while self.rotation and skipped < len(self.rotation):
+            host = self.rotation[0]
+
+            if self.host_full(host):
+                # Host at its limit, next host's turn
+                self.rotation.rotate(-1)
+                skipped += 1
+                continue
+
+            now = time.monotonic()
+            if not self.bucket.take(now):
+                # Out of tokens, come back once the next one is in
+                if not self.pump_scheduled:
+                    self.pump_scheduled = True
+                    self.schedule(self.bucket.wait_time(now), self.scheduled_pump)
+                return
+
+            queue = self.pending[host]
+            start = queue.popleft()
+            self.queued -= 1
+            self.active[host] = self.active.get(host, 0) + 1
+
+            if queue:
+                self.rotation.rotate(-1)
+            else:
+                del self.pending[host]
+                self.rotation.popleft()
+            skipped = 0
+
+            start()
+
+    def scheduled_pump(self):
+        self.pump_scheduled = False
+        self.pump()
+
+    def waiting_on_hosts(self):
+        """
+        :return: int - queued checks whose host is at its limit (the rest wait on the rate limit)
+        """
+        return sum(len(self.pending[host]) for host in self.rotation if self.host_full(host))
@@ -0,0 +1,118 @@
+class SearchIndex:
+    """
+    Incremental search over the server list, name/url/port/status/group
+    Keeps a trigram -> servers index, so a query only verifies the servers sharing
+    its trigrams instead of looking at every row.
+    Typing one more character narrows the previous result, it never starts over
+
+    Queries are whitespace separated terms, a server has to contain all of them (case insensitive)
+    """
+
+    def __init__(self):
+        # {name: lowercase searchable text}
+        self.texts = {}
+        # {trigram: set(name, ...)}
+        self.trigrams = {}
+
+        # Last query and its result, for narrowing down while typing
+        self.last_query = None
+        self.last_result = None
+
+    @staticmethod
+    def split_trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def update(self, name, *fields):
+        """
+        (Re)indexes a server, only touches the trigrams that changed
+        :param name: str - Server name
+        :param fields: str - Anything else the server should be found by
+        """
+        text = " ".join(str(field) for field in (name,) + fields).lower()
+        old_text = self.texts.get(name)
+        if old_text == text:
+            return
+
+        old = self.split_trigrams(old_text) if old_text is not None else set()
+        new = self.split_trigrams(text)
+
+        for trigram in old - new:
+            names = self.trigrams[trigram]
+            names.discard(name)
+            if not names:
+                del self.trigrams[trigram]
+        for trigram in new - old:
+            self.trigrams.setdefault(trigram, set()).add(name)
+
+        self.texts[name] = text
+        self.last_query = None
+
+    def remove(self, name):
+        text = self.texts.pop(name, None)
+        if text is None:
+            return
+
+        for trigram in self.split_trigrams(text):
+            names = self.trigrams.get(trigram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.trigrams[trigram]
+
+        self.last_query = None
+
+    def matches(self, name, query):
+        """
+        :return: bool - True if a single server matches the query, without touching the rest
+        """
+        text = self.texts.get(name)
+        if text is None:
+            return False
+        return all(term in text for term in query.strip().lower().split())
+
+    def candidates(self, term):
+        """
+        :param term: str - lowercase search term
+        :return: set or None - servers that can contain the term, None if the index can't narrow it down
+        """
+        if len(term) < 3:
+            return None
+
+        result = None
+        for trigram in self.split_trigrams(term):
+            names = self.trigrams.get(trigram)
+            if not names:
+                return set()
+            result = set(names) if result is None else result & names
+            if not result:
+                break
+        return result
+
+    def search(self, query):
+        """
+        :param query: str
+        :return: set or None - matching server names, None for an empty query (everything matches)
+        """
+        query = query.strip().lower()
+        terms = query.split()
+        if not terms:
+            self.last_query, self.last_result = query, None
+            return None
+
+        # Typing on: longer terms or extra terms, the new result can only be a subset of the last one
+        if self.last_query and self.last_result is not None and query.startswith(self.last_query):
+            pool = self.last_result
+        else:
+            pool = None
+            for term in terms:
+                found = self.candidates(term)
+                if found is not None:
+                    pool = found if pool is None else pool & found
+            if pool is None:
+                pool = self.texts.keys()
+
+        texts = self.texts
+        result = {name for name in pool if all(term in texts[name] for term in terms)}
+
+        self.last_query, self.last_result = query, result
+        return result
@@ -0,0 +1,391 @@
+"""
+Soak/leak test mode
+Runs the tool against local stand-in servers for thousands of checks back to back
+(no waiting for the interval timer), and records resource usage after every check:
+RSS, traced python memory, live threads, live QThreads and Qt objects.
+Fails (exit code 1) when any of them keeps growing past its threshold,
+or when a check got any other status than its stand-in should give.
+
+Usage: py main.py --soak 5000 --targets 50 --report soak.csv
+"""
+
+import csv
+import gc
+import logging
+import os
+import socket
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PyQt5.QtCore import QObject, QThread
+
+import tool.Constants as const
+from tool import ConfigHandler
+
+
+def get_rss():
+    """
+    :return: int or None - Resident memory of this process in bytes, None if unknown
+    """
+    # psutil is optional, only used if it happens to be installed
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    # Linux without psutil
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers every GET with a small 200 page
+    """
+    def do_GET(self):
+        body = b"<html><body>soak stand-in OK</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Thousands of requests, keep the console quiet
+        pass
+
+
+class StandInServers:
+    """
+    Local servers to check against, all on 127.0.0.1
+    tcp_port - accepts and closes connections (Online)
+    http_port - small http server (website, [200] - OK)
+    closed_port - nothing listening (Refused)
+    udp_port - UDP echo (Echo OK)
+    dns_port - answers every DNS query with an empty NOERROR (DNS NOERROR)
+    """
+
+    def __init__(self):
+        self.threads = []
+        self.stopped = threading.Event()
+
+        # Filled by make_servers(), {server name: (stand-in, status its checks should get)}
+        self.expected = {}
+
+        # Plain TCP, accept and hang up
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp.bind(("127.0.0.1", 0))
+        self.tcp.listen(1024)
+        self.tcp.settimeout(0.2)
+        self.tcp_port = self.tcp.getsockname()[1]
+
+        # Website
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        self.http.daemon_threads = True
+        self.http_port = self.http.server_address[1]
+
+        # UDP echo and DNS
+        self.udp = self.bind_udp()
+        self.udp_port = self.udp.getsockname()[1]
+        self.dns = self.bind_udp()
+        self.dns_port = self.dns.getsockname()[1]
+
+        # Grab a free port and close it again, nothing listens there afterwards
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(("127.0.0.1", 0))
+        self.closed_port = closed.getsockname()[1]
+        closed.close()
+
+    @staticmethod
+    def bind_udp():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(0.2)
+        return sock
+
+    def start(self):
+        for target, args in ((self._accept_loop, ()), (self.http.serve_forever, ()),
+                             (self._datagram_loop, (self.udp, self.echo)),
+                             (self._datagram_loop, (self.dns, self.dns_answer))):
+            thread = threading.Thread(target=target, args=args, name="SoakStandIn", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopped.set()
+        self.http.shutdown()
+        self.http.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.tcp.close()
+        self.udp.close()
+        self.dns.close()
+
+    def _accept_loop(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self.tcp.accept()
+                conn.close()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+    def _datagram_loop(self, sock, answer):
+        while not self.stopped.is_set():
+            try:
+                data, address = sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            reply = answer(data)
+            if reply:
+                sock.sendto(reply, address)
+
+    @staticmethod
+    def echo(data):
+        return data
+
+    @staticmethod
+    def dns_answer(query):
+        """
+        :return: bytes - the query turned into an answer (QR set, NOERROR) with no records
+        """
+        if len(query) < 12:
+            return None
+        flags = int.from_bytes(query[2:4], "big") | 0x8080     # QR + recursion available
+        return query[:2] + (flags & 0xFFF0).to_bytes(2, "big") + query[4:]
+
+    def make_servers(self, count):
+        """
+        :param count: int - How many servers to make
+        :return: dict - Server list in the self.servers format, a mix of all stand-ins
+            Websites and DNS queries get their own path/name so each one is a separate check,
+            the plain TCP and UDP ones are identical and share a check
+        """
+        # (stand-in, server settings, expected status)
+        kinds = [
+            ("tcp", {'url': "127.0.0.1", 'port': self.tcp_port, 'type': "tcp", 'web': False}, "Online"),
+            ("http", {'url': "127.0.0.1/soak-{}", 'port': self.http_port, 'type': "http", 'web': True},
+             "[200] - OK"),
+            ("closed", {'url': "127.0.0.1", 'port': self.closed_port, 'type': "tcp", 'web': False}, "Refused"),
+            ("udp", {'url': "127.0.0.1", 'port': self.udp_port, 'type': "udp", 'web': False}, "Echo OK"),
+            ("dns", {'url': "127.0.0.1/soak-{}.example", 'port': self.dns_port, 'type': "dns", 'web': False},
+             "DNS NOERROR"),
+        ]
+
+        servers = {}
+        self.expected = {}
+        for i in range(count):
+            kind, server, status = kinds[i % len(kinds)]
+            server = dict(server)
+            server['url'] = server['url'].format(i)
+            servers[f"soak-{i}"] = server
+            self.expected[f"soak-{i}"] = (kind, status)
+        return servers
+
+
+class SoakRunner:
+    """
+    Drives a ConnectionTool through the given number of checks and keeps the measurements
+    """
+
+    def __init__(self, app, sweeps, targets, max_rss_growth_mb=const.SOAK_MAX_RSS_GROWTH_MB,
+                 max_thread_growth=const.SOAK_MAX_THREAD_GROWTH, max_object_growth=const.SOAK_MAX_OBJECT_GROWTH,
+                 snapshot_every=const.SOAK_SNAPSHOT_EVERY, report=None):
+        """
+        :param app: QApplication
+        :param sweeps: int - Number of full connection checks to run
+        :param targets: int - Number of servers to check, spread over the stand-ins
+        :param max_rss_growth_mb: float - Allowed RSS growth after the warm up
+        :param max_thread_growth: int - Allowed growth of live (Q)threads after the warm up
+        :param max_object_growth: int - Allowed growth of live Qt objects after the warm up
+        :param snapshot_every: int - Log the top tracemalloc allocators every x checks
+        :param report: str - Optional csv file, one line of measurements per check
+        """
+        self.logger = logging.getLogger("tool.Soak")
+
+        self.app = app
+        self.sweeps = sweeps
+        self.targets = targets
+        self.max_rss_growth = max_rss_growth_mb * 1024 * 1024
+        self.max_thread_growth = max_thread_growth
+        self.max_object_growth = max_object_growth
+        self.snapshot_every = snapshot_every
+        self.report = report
+
+        # One dict per check
+        self.samples = []
+        # Statuses the checks got, {stand-in: Counter({status: checks})}
+        self.statuses = {}
+
+    @staticmethod
+    def count_qthreads():
+        return sum(1 for obj in gc.get_objects() if isinstance(obj, QThread))
+
+    def measure(self, tool, sweep, duration):
+        traced, _ = tracemalloc.get_traced_memory()
+        return {
+            'sweep': sweep,
+            'duration': round(duration, 4),
+            'rss': get_rss(),
+            'traced': traced,
+            'threads': threading.active_count(),
+            'qthreads': self.count_qthreads(),
+            'qt_objects': len(tool.findChildren(QObject)),
+        }
+
+    def run_sweep(self, tool):
+        """
+        Starts a connection check and runs the event loop until every worker answered
+        :return: float - How long the check took, in seconds
+        """
+        started = time.perf_counter()
+        deadline = started + const.SOAK_SWEEP_TIMEOUT
+
+        tool.refresh_servers()
+        while tool.active_workers > 0:
+            self.app.processEvents()
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Check did not finish within {const.SOAK_SWEEP_TIMEOUT}s, "
+                                   f"{tool.active_workers} workers still active")
+            time.sleep(0.001)
+
+        return time.perf_counter() - started
+
+    def count_statuses(self, tool, stand_ins):
+        for name, (kind, _) in stand_ins.expected.items():
+            response = tool.last_responses.get(name)
+            status = response['status'] if response is not None else "no result"
+            self.statuses.setdefault(kind, Counter())[status] += 1
+
+    def check_statuses(self, stand_ins):
+        """
+        :return: list - Failure messages, one per stand-in that gave any unexpected status
+        """
+        expected = dict(stand_ins.expected.values())
+        failures = []
+        for kind, counts in sorted(self.statuses.items()):
+            total = sum(counts.values())
+            wrong = {status: n for status, n in counts.items() if status != expected[kind]}
+            if wrong:
+                failures.append(f"{kind}: {sum(wrong.values())} of {total} checks got {wrong}, "
+                                f"expected '{expected[kind]}'")
+        return failures
+
+    def log_top_allocators(self, baseline, sweep):
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(baseline, "lineno")[:const.SOAK_TOP_ALLOCATORS]
+        self.logger.info("Top allocators since warm up, after check %d:\n\t%s",
+                         sweep, "\n\t".join(str(stat) for stat in stats))
+
+    def check_growth(self):
+        """
+        Compares the measurements at the end against the ones right after the warm up
+        :return: list - Failure messages, empty if everything stayed within its threshold
+        """
+        warmup = max(1, len(self.samples) // 10)
+        # Average a few checks on both ends, a single check can be noisy
+        window = max(1, min(10, len(self.samples) // 10))
+        if len(self.samples) < warmup + 2 * window:
+            return [f"not enough samples ({len(self.samples)} checks) to tell growth from warm up, "
+                    f"run at least {warmup + 2 * window}"]
+        start = self.samples[warmup:warmup + window]
+        end = self.samples[-window:]
+
+        def growth(key):
+            if not start or not end or any(sample[key] is None for sample in start + end):
+                return None
+            return sum(s[key] for s in end) / len(end) - sum(s[key] for s in start) / len(start)
+
+        failures = []
+        for key, limit in (('rss', self.max_rss_growth), ('traced', self.max_rss_growth),
+                           ('threads', self.max_thread_growth), ('qthreads', self.max_thread_growth),
+                           ('qt_objects', self.max_object_growth)):
+            grown = growth(key)
+            if grown is not None and grown > limit:
+                failures.append(f"{key} grew by {grown:.0f} (limit {limit:.0f})")
+        return failures
+
+    def write_report(self):
+        with open(self.report, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(self.samples[0]))
+            writer.writeheader()
+            writer.writerows(self.samples)
+
+    def run(self):
+        """
+        :return: int - Exit code, 0 if nothing leaked, 1 otherwise
+        """
+        # Imported here, the tool module sets up logging on import
+        from tool.tool import ConnectionTool
+
+        stand_ins = StandInServers()
+        stand_ins.start()
+
+        tracemalloc.start()
+        # Config, server list and snapshot go to a scratch directory, removed afterwards
+        try:
+            with ConfigHandler.scratch_dir("connectiontool-soak-") as workdir:
+                self.soak(ConnectionTool(base_dir=workdir), stand_ins)
+        finally:
+            tracemalloc.stop()
+            stand_ins.stop()
+
+        if self.report:
+            self.write_report()
+
+        failures = self.check_growth() + self.check_statuses(stand_ins)
+        last = self.samples[-1]
+        statuses = " | ".join(f"{kind} {dict(counts)}" for kind, counts in sorted(self.statuses.items()))
+        self.logger.info("Soak finished, %d checks of %d servers\n\t"
+                         "- Last: rss %s | traced %s | threads %s | qthreads %s | qt objects %s\n\t"
+                         "- Statuses: %s", self.sweeps, self.targets, last['rss'], last['traced'],
+                         last['threads'], last['qthreads'], last['qt_objects'], statuses)
+
+        for failure in failures:
+            self.logger.error("Soak failed: %s", failure)
+
+        return 1 if failures else 0
+
+    def soak(self, tool, stand_ins):
+        """
+        Runs every check against the stand-ins, measuring after each one
+        :param tool: ConnectionTool - closed afterwards
+        :param stand_ins: StandInServers
+        """
+        try:
+            # Let the startup finish, then take over the clock
+            self.app.processEvents()
+            tool.timer.stop()
+            tool.notify = False
+
+            tool.servers = stand_ins.make_servers(self.targets)
+            tool.fill_settings_table()
+
+            baseline = None
+            for sweep in range(1, self.sweeps + 1):
+                duration = self.run_sweep(tool)
+                self.count_statuses(tool, stand_ins)
+                gc.collect()
+                self.samples.append(self.measure(tool, sweep, duration))
+
+                if sweep == max(1, self.sweeps // 10):
+                    baseline = tracemalloc.take_snapshot()
+                elif baseline is not None and sweep % self.snapshot_every == 0:
+                    self.log_top_allocators(baseline, sweep)
+
+            if baseline is not None:
+                self.log_top_allocators(baseline, self.sweeps)
+        finally:
+            # Closed before the scratch directory goes, writes out the config and snapshot
+            tool.close()
@@ -0,0 +1,68 @@
+import time
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+from tool import History
+
+
+class SparklineDelegate(QStyledItemDelegate):
+    """
+    Draws the latency history of a server inside a table cell
+    One pixel column per bucket from History.DownsampleCache, so drawing costs
+    O(cell width) no matter how much history there is
+    Latency min-max is drawn as a vertical line, columns with a down check get a red mark
+
+    The server name is read from the cell's Qt.UserRole data
+    """
+
+    LATENCY_COLOR = QColor(40, 120, 200)
+    DOWN_COLOR = QColor(210, 40, 40)
+
+    def __init__(self, history, parent=None):
+        """
+        :param history: History.ProbeHistory
+        """
+        super().__init__(parent)
+        self.cache = History.DownsampleCache(history)
+
+    def forget(self, name):
+        self.cache.forget(name)
+
+    def paint(self, painter, option, index):
+        # Selection/alternating background, like any other cell
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+
+        name = index.data(Qt.UserRole)
+        if name is None:
+            return
+
+        rect = option.rect.adjusted(1, 2, -1, -2)
+        if rect.width() <= 0 or rect.height() <= 0:
+            return
+
+        columns = self.cache.columns(name, rect.width(), time.time())
+        if not columns:
+            return
+
+        # Scale to the highest latency in view
+        highest = max((high for _, _, high, _ in columns if high is not None), default=0)
+        scale = (rect.height() - 1) / highest if highest > 0 else 0
+        bottom = rect.bottom()
+
+        painter.save()
+        latency_pen = QPen(self.LATENCY_COLOR)
+        down_pen = QPen(self.DOWN_COLOR)
+
+        for column, low, high, down in columns:
+            x = rect.left() + column
+            if high is not None:
+                painter.setPen(latency_pen)
+                painter.drawLine(x, bottom - int(low * scale), x, bottom - int(high * scale))
+            if down:
+                painter.setPen(down_pen)
+                painter.drawLine(x, rect.top(), x, rect.top() + 3)
+
+        painter.restore()
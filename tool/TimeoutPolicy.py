@@ -0,0 +1,91 @@
+from collections import deque
+import math
+
+import tool.Constants as const
+
+
+class TimeoutPolicy:
+    """
+    Works out a timeout per server from its recent latencies
+    timeout = percentile(latencies) * factor, clamped between minimum and maximum
+
+    A server in the local rack answering in 2ms gets a short timeout,
+    so a dead one frees its worker quickly. Servers without enough samples yet
+    (new, or never been online) get the maximum timeout
+
+    A check that timed out may get one retry, retry_timeout() keeps the first try plus
+    the retry within the maximum, so a dead server is never held longer than without retries
+    """
+
+    def __init__(self, minimum, maximum, factor, percentile=const.TIMEOUT_PERCENTILE,
+                 samples=const.TIMEOUT_SAMPLES):
+        """
+        :param minimum: float - Lowest timeout ever handed out, in seconds
+        :param maximum: float - Highest timeout, also used when there is not enough data
+        :param factor: float - Multiplier applied on top of the percentile
+        :param percentile: float - 0-100, which latency percentile to base the timeout on
+        :param samples: int - How many of the most recent latencies to keep per server
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.percentile = percentile
+        self.samples = samples
+
+        # {name: deque([latency, ...])}, successful checks only
+        self.latencies = {}
+
+        # {name: timeout}, recalculated when a new latency comes in
+        self.timeouts = {}
+
+    def record(self, name, latency):
+        """
+        Store the latency of a successful check
+        :param name: str - Server name
+        :param latency: float - seconds, None if the check failed (ignored)
+        """
+        if latency is None:
+            return
+
+        history = self.latencies.get(name)
+        if history is None:
+            history = self.latencies[name] = deque(maxlen=self.samples)
+        history.append(latency)
+
+        # Recalculate now, timeout_for() gets called a lot more often than this
+        self.timeouts.pop(name, None)
+
+    def forget(self, name):
+        self.latencies.pop(name, None)
+        self.timeouts.pop(name, None)
+
+    def timeout_for(self, name):
+        """
+        :param name: str - Server name
+        :return: float - Timeout in seconds to use for the next check
+        """
+        timeout = self.timeouts.get(name)
+        if timeout is not None:
+            return timeout
+
+        history = self.latencies.get(name)
+        if history is None or len(history) < const.TIMEOUT_MIN_SAMPLES:
+            return self.maximum
+
+        ordered = sorted(history)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        timeout = max(self.minimum, min(self.maximum, ordered[index] * self.factor))
+
+        self.timeouts[name] = timeout
+        return timeout
+
+    def retry_timeout(self, timeout):
+        """
+        :param timeout: float - Timeout of the first try, in seconds
+        :return: float - Timeout for the retry after a timed out first try,
+                 None if the maximum leaves no room for one worth doing
+        """
+        retry = min(timeout * const.RETRY_TIMEOUT_FACTOR, self.maximum - timeout)
+        if retry < self.minimum:
+            return None
+        return retry
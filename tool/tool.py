@@ -1,12 +1,15 @@
+import csv
 import logging
 import pickle
+import time
+from contextlib import contextmanager
 
 from os import (
     getcwd
 )
 
 # PyQt5 imports - All the UI stuff
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QMainWindow,
     QWidget,
@@ -23,25 +26,34 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QMessageBox,
     QAbstractItemView,
+    QComboBox,
+    QFileDialog,
 )
 from PyQt5.QtGui import (
-    QIcon, QStandardItemModel, QStandardItem
+    QIcon, QStandardItemModel, QStandardItem, QBrush, QColor
 )
 
 # Local imports
 from tool import (
     ConnectionChecker,
+    Probes,
     ConfigHandler,
     NotificationHandler,
+    TimeoutPolicy,
+    ContentCheck,
+    History,
+    Sparkline,
+    Aggregates,
+    SearchIndex,
+    Scheduler,
+    Replay,
+    LogHandler,
+    PushApi,
     Constants as const
 )
 
-# Logging setup
-logging.basicConfig(level=logging.DEBUG if const.DEBUG_MODE else logging.INFO,
-                    format=const.LOGGER_FORMAT,
-                    datefmt=const.LOGGER_DATE_FORMAT,
-                    filename=const.DEBUG_FILE if const.DEBUG_OUT else None,
-                    filemode="w+" if const.DEBUG_OUT else None)
+# Logging setup, records get written on a background thread
+LogHandler.setup_logging()
 
 
 class ConnectionTool(QMainWindow):
@@ -50,26 +62,63 @@ class ConnectionTool(QMainWindow):
     Docs -> docs/tool.ConnectionTool.rst
     Handles all of the UI things
     """
-    def __init__(self):
+    # Emitted from the file watcher thread, handled on the GUI thread
+    config_reloaded = pyqtSignal(set)       # Changed (section, value_name) keys
+    servers_reloaded = pyqtSignal(dict)     # New server list, read from disk
+
+    def __init__(self, start_time=None, base_dir=None):
+        """
+        :param start_time: float - time.perf_counter() taken at launch, used to report the startup time
+        :param base_dir: str - directory with the config folder, defaults to the working directory
+        """
         super().__init__()
 
+        # perf_counter() at launch, falls back to now if not given
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+
         # Logger
         self.logger = logging.getLogger("tool.ConnectionTool")
+        # Per server/per result logs, a subsystem of their own so they can be sampled (LOG_SAMPLING)
+        self.server_logger = logging.getLogger("tool.ConnectionTool.servers")
+        self.response_logger = logging.getLogger("tool.ConnectionTool.responses")
 
         # Main working directory (full path of where main.py got executed)
-        self.dir = getcwd()
+        self.dir = base_dir or getcwd()
 
         # Config handler
         self.config = ConfigHandler.ConfigHandler(
             const.CONFIG_FILENAME,
-            logging.getLogger("tool.ConfigHandler")
+            logging.getLogger("tool.ConfigHandler"),
+            self.dir
         )
 
         # Interval between connection checks, int
-        _, self.interval = self.convert_to_int(self.config.get_value("interval_checks"))
+        self.interval = self.config.get_value("interval_checks", return_type=int,
+                                              fallback=const.DEFAULT_INTERVAL)
 
         # Notify on status changes?, bool
-        self.notify = self.convert_to_bool(self.config.get_value("notify_status_change"))
+        self.notify = self.config.get_value("notify_status_change", return_type=bool, fallback=True)
+
+        # Per server timeouts, based on how fast each server usually answers
+        self.timeouts = TimeoutPolicy.TimeoutPolicy(*self.get_timeout_settings())
+        self.retry_on_timeout = self.config.get_value("retry_on_timeout", return_type=bool, fallback=True)
+
+        # Content checks stop reading a website's body after this many bytes
+        self.content_max_bytes = self.config.get_value("content_max_bytes", return_type=int,
+                                                       fallback=const.CONTENT_MAX_BYTES)
+
+        # Servers with a parent that is down only get checked every x connection checks, 0 = never
+        self.parent_down_check_every = self.config.get_value("parent_down_check_every", return_type=int,
+                                                             fallback=const.PARENT_DOWN_CHECK_EVERY)
+        # Number of connection checks done, for the above
+        self.sweep_count = 0
+
+        # Limits how many checks hit the same host at once and how fast new connections start
+        # Checks over the limits wait in its queue, their worker only gets made once they may start
+        self.scheduler = Scheduler.ProbeScheduler(
+            *self.get_scheduler_settings(),
+            lambda delay, callback: QTimer.singleShot(int(delay * 1000) + 1, callback)
+        )
 
         # Counts ticks, +1 per second. if tick_counter == interval -> connection check
         self.tick_counter = 0
@@ -78,12 +127,59 @@ class ConnectionTool(QMainWindow):
         # Format: name: {url: str, port: int, web: bool}
         self.servers = {}
 
+        # Servers per parent name, kept by add_settings_row()/remove_server()
+        # {parent: {name, ...}}
+        self.child_servers = {}
+
         # The saved statuses for if the user uses notifications
         self.saved_status = {}
 
-        # Workers and assigned rows for the results
-        # {name: {worker: workerObj, row: int}, ...}
+        # Latency/up history per server, drawn in the history column of the status table
+        self.history = History.ProbeHistory()
+
+        # Uptime and latency percentiles over 1h/24h/30d per server
+        # {name: Aggregates.ServerAggregates}
+        self.aggregates = {}
+        # Servers whose latency column is out of date, redrawn every LATENCY_REFRESH seconds
+        self.latency_dirty = set()
+
+        # Last full response per server, snapshotted on exit and shown on the next launch
+        # {name: response_dict}
+        self.last_responses = {}
+
+        # Workers for the current check, one per unique url/port/type/content check
+        # worker is None while the check is queued in self.scheduler, the Probes.Probe once it runs
+        # {probe_id: {worker: Probe, servers: [name, ...], host: str}, ...}
         self.workers = {}
+
+        # Runs the checks, one batched executor per probe type
+        self.dispatcher = ConnectionChecker.ProbeDispatcher(logging.getLogger("tool.Probes"))
+        self.dispatcher.worker_response.connect(self.probe_response)
+
+        # False while replaying a recording, no check may go out then
+        self.probing = True
+        # Writes every result to a replay file while set, see Replay.py
+        self.recorder = None
+        # Streams results to local subscribers while set, see PushApi.py
+        self.push = None
+
+        # The rows of each server in both tables, by the item in their name column
+        # item.row() stays correct when rows above get deleted or the table gets sorted
+        # {name: QStandardItem}
+        self.settings_rows = {}
+        self.status_rows = {}
+
+        # Search over name/url/port/status/group, filters both tables
+        self.search = SearchIndex.SearchIndex()
+        # Current search and the servers matching it, None if not searching (all visible)
+        self.search_query = ""
+        self.search_result = None
+
+        # Group rollups, {group: [servers, down]} and the rows showing them {group: [group item, count item]}
+        self.groups = {}
+        self.group_rows = {}
+        # Last known up/down per server, for the group rollups
+        self.server_up = {}
         # Keep track of how many workers are currently running a check
         self.active_workers = 0
 
@@ -97,6 +193,11 @@ class ConnectionTool(QMainWindow):
         self.server_list_settings = None
         # The server list on the status side, build by the program | QStandardItemModel
         self.server_list_status = None
+        # Group rollups on the status side | QStandardItemModel
+        self.group_list = None
+        # The table views of both server lists, rows get hidden by the search
+        self.settings_view = None
+        self.status_view = None
 
         # Start initializing UI
         self.init_ui()
@@ -105,9 +206,25 @@ class ConnectionTool(QMainWindow):
         # Load saved serverlist and write to table if any
         self.load_servers()
 
+        # Show the results from the last run straight away, marked as stale
+        self.load_snapshot()
+
+        # Pick up changes to the config and server list made outside the tool
+        # The watcher calls these from its own thread, the signals move them onto the GUI thread
+        self.config_reloaded.connect(self.apply_config)
+        self.servers_reloaded.connect(self.apply_servers)
+        self.config.add_listener(self.config_reloaded.emit)
+        self.config.watcher.watch(self.path(const.SERVER_FILE), self.read_servers_file)
+
+        # Off unless a port is set in the config
+        self.start_push_api(self.config.get_value("push_api_port", return_type=int, fallback=const.PUSH_API_PORT))
+
         # Start timer
         self.timer = self.init_timer()
 
+        # Runs once the event loop is up and the window got drawn
+        QTimer.singleShot(0, self.startup_finished)
+
     """
         = UI INITIALIZATION =
     """
@@ -122,12 +239,10 @@ class ConnectionTool(QMainWindow):
         x = self.config.get_value("location_x", "WINDOW", return_type=int)
         y = self.config.get_value("location_y", "WINDOW", return_type=int)
 
-        self.logger.debug(f"{width}, {height}, {x}, {y}")   # debug
-
         # Set window size, title and icon
         self.setGeometry(x, y, width, height)
         self.setWindowTitle(const.WINDOW_TITLE)
-        self.setWindowIcon(QIcon(self.dir + const.WINDOW_ICON))
+        self.setWindowIcon(QIcon(self.path(const.WINDOW_ICON)))
 
         # Setup main widget and layout
         main_widget = QWidget()
@@ -138,7 +253,7 @@ class ConnectionTool(QMainWindow):
         use_stylesheet = self.config.get_value("custom_style", "WINDOW")
         use_stylesheet = self.convert_to_bool(use_stylesheet)
         if use_stylesheet:
-            main_widget.setStyleSheet(open(self.dir + "\\css\\stylesheet.css").read())
+            main_widget.setStyleSheet(open(self.path("\\css\\stylesheet.css")).read())
 
         # Initialize menu and status bar
         self.init_ui_bars()
@@ -172,14 +287,27 @@ class ConnectionTool(QMainWindow):
         style_toggle.setStatusTip("Toggle custom style")
         style_toggle.triggered.connect(self.toggle_style)
 
+        # Record results for a replay
+        record_results = QAction("&Record results...", self, checkable=True)
+        record_results.setStatusTip("Record every check result to a file, replay it with --replay")
+        record_results.triggered.connect(self.record_results_clicked)
+        record_results.setObjectName("record_results")
+
+        # Export uptime/latency statistics
+        export_stats = QAction("&Export statistics...", self)
+        export_stats.setStatusTip("Export uptime and latency statistics to a csv file")
+        export_stats.triggered.connect(self.export_statistics_clicked)
+
         # Exit action for the tool menu section in the menu bar
-        tool_exit = QAction(QIcon(self.dir + const.EXIT_ICON), "Exit", self)
+        tool_exit = QAction(QIcon(self.path(const.EXIT_ICON)), "Exit", self)
         tool_exit.setShortcut("Ctrl+Q")
         tool_exit.setStatusTip("Exit the application")
         tool_exit.triggered.connect(self.close)
 
         # Add new action to the given section 'Tool' in the menu bar
         tool_menu.addAction(style_toggle)
+        tool_menu.addAction(export_stats)
+        tool_menu.addAction(record_results)
         tool_menu.addAction(tool_exit)
 
         # setting up the status bar
@@ -214,7 +342,7 @@ class ConnectionTool(QMainWindow):
         server_list = QTableView()
         server_list_model = QStandardItemModel()
         server_list_model.setHorizontalHeaderLabels([
-            "Name/ID", "Server", "Port", "is website?"
+            "Name/ID", "Server", "Port", "Type", "Content check", "Group", "Parent"
         ])
         server_list.setModel(server_list_model)
 
@@ -228,8 +356,12 @@ class ConnectionTool(QMainWindow):
         # Disable editing (for now?)
         server_list.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
+        # Click a header to sort
+        server_list.setSortingEnabled(True)
+
         # Accessible through self.findChild() if needed
         server_list.setObjectName("settings_server_list")
+        self.settings_view = server_list
 
         # More often needed, also causes issues through findChild()
         # So we are adding a pointer to the model in self.server_list_settings
@@ -266,7 +398,18 @@ class ConnectionTool(QMainWindow):
         form_url = QLineEdit()
         form_name = QLineEdit()
         form_port = QLineEdit("80")
-        form_web = QCheckBox()
+        form_type = QComboBox()
+        for type_name, probe_type in Probes.PROBE_TYPES.items():
+            form_type.addItem(probe_type.title, type_name)
+        form_type.currentIndexChanged.connect(self.server_type_changed)
+        form_check_type = QComboBox()
+        form_check_type.addItems(["None"] + list(ContentCheck.CHECK_TYPES))
+        form_check_value = QLineEdit()
+        form_check_value.setPlaceholderText("Text, regex or json.field=value")
+        form_group = QLineEdit()
+        form_group.setPlaceholderText("Optional, e.g. db")
+        form_parent = QLineEdit()
+        form_parent.setPlaceholderText("Optional, name of e.g. the gateway")
 
         form_add = QPushButton("Add server")
         form_add.clicked.connect(self.add_server_clicked)
@@ -275,7 +418,11 @@ class ConnectionTool(QMainWindow):
         form_url.setObjectName("server_form_url")
         form_name.setObjectName("server_form_name")
         form_port.setObjectName("server_form_port")
-        form_web.setObjectName("server_form_web")
+        form_type.setObjectName("server_form_type")
+        form_check_type.setObjectName("server_form_check_type")
+        form_check_value.setObjectName("server_form_check_value")
+        form_group.setObjectName("server_form_group")
+        form_parent.setObjectName("server_form_parent")
 
         # Make the 'port' textbox smaller as it does not need much space
         form_port.setMaximumWidth(65)
@@ -290,8 +437,15 @@ class ConnectionTool(QMainWindow):
         form_grid.addWidget(form_port, 0, 3)
         form_grid.addWidget(QLabel("Name"), 1, 0)
         form_grid.addWidget(form_name, 1, 1)
-        form_grid.addWidget(QLabel("Website?: "), 1, 2)
-        form_grid.addWidget(form_web, 1, 3)
+        form_grid.addWidget(QLabel("Type:"), 1, 2)
+        form_grid.addWidget(form_type, 1, 3)
+        form_grid.addWidget(QLabel("Content:"), 2, 0)
+        form_grid.addWidget(form_check_value, 2, 1)
+        form_grid.addWidget(form_check_type, 2, 2, 1, 2)
+        form_grid.addWidget(QLabel("Group:"), 3, 0)
+        form_grid.addWidget(form_group, 3, 1)
+        form_grid.addWidget(QLabel("Parent:"), 4, 0)
+        form_grid.addWidget(form_parent, 4, 1)
 
         # Add our grid layout to the parent layout
         server_form_layout.addLayout(form_grid)
@@ -323,6 +477,7 @@ class ConnectionTool(QMainWindow):
 
         # Checkbox, notify on server status change? - toggles self.notify
         notify_check = QCheckBox("Notify on status change?")
+        notify_check.setObjectName("notify_check")
         notify_check.stateChanged.connect(self.notify_changed)
         settings_layout.addWidget(notify_check)
 
@@ -340,11 +495,36 @@ class ConnectionTool(QMainWindow):
         status_area.setLayout(status_layout)
         main_layout.addWidget(status_area, 0, 1)
 
+        # Search box, filters both server lists while typing
+        search = QLineEdit()
+        search.setPlaceholderText("Search name, server, port, status or group...")
+        search.setClearButtonEnabled(True)
+        search.setObjectName("search_text")
+        search.textChanged.connect(self.search_changed)
+        status_layout.addWidget(search)
+
+        # Group rollups, "db | 3/40 down", click one to search for it
+        groups = QTableView()
+        group_model = QStandardItemModel()
+        group_model.setHorizontalHeaderLabels(["Group", "Down"])
+        groups.setModel(group_model)
+        groups.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        groups.setSortingEnabled(True)
+        groups.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        groups.verticalHeader().setVisible(False)
+        groups.setMaximumHeight(120)
+        groups.clicked.connect(self.group_clicked)
+        groups.setObjectName("status_group_list")
+        self.group_list = group_model
+        status_layout.addWidget(groups)
+
         # Server status table
         status = QTableView()
         status_model = QStandardItemModel()
         status_model.setHorizontalHeaderLabels([
-            "Status", "Name", "IPv4/6", "URL", "Port"
+            "Status", "Name", "IPv4/6", "URL", "Port", "History"
+        ] + [f"Up {title}" for title, _, _ in Aggregates.WINDOWS] + [
+            "p" + "/".join(str(p) for p in const.LATENCY_PERCENTILES) + f" ({const.LATENCY_WINDOW})"
         ])
         status.setModel(status_model)
 
@@ -355,11 +535,20 @@ class ConnectionTool(QMainWindow):
         status.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
         status.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
 
+        # History column draws a downsampled latency graph instead of text
+        self.sparkline = Sparkline.SparklineDelegate(self.history, status)
+        status.setItemDelegateForColumn(5, self.sparkline)
+        status.horizontalHeader().setSectionResizeMode(5, QHeaderView.Stretch)
+
         # Disables user editing of this table
         status.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
+        # Click a header to sort
+        status.setSortingEnabled(True)
+
         # Set object name for our QTableView
         status.setObjectName("status_server_list")
+        self.status_view = status
 
         # Make our model easily accessible
         self.server_list_status = status_model
@@ -394,7 +583,11 @@ class ConnectionTool(QMainWindow):
         self.status_bar_timer.setText(f"{self.tick_counter}/{self.interval}")
 
         if self.active_workers > 0:
-            self.status_bar_workers.setText(f"Connections active - {self.active_workers}")
+            queued = self.scheduler.queued
+            text = f"Connections active - {self.active_workers - queued}"
+            if queued:
+                text += f" | Queued - {queued} (host limit {self.scheduler.waiting_on_hosts()})"
+            self.status_bar_workers.setText(text)
         else:
             self.status_bar_workers.setText("No active connections")
 
@@ -417,29 +610,388 @@ class ConnectionTool(QMainWindow):
         # Load server list
         try:
             # Open and read the saved servers into self.servers
-            with open(self.dir + const.SERVER_FILE, 'rb') as handle:
+            with open(self.path(const.SERVER_FILE), 'rb') as handle:
                 self.servers = pickle.load(handle)
 
             # Loaded server list, write onto table
+            self.fill_settings_table()
+
+        except FileNotFoundError:
+            pass
+
+    def fill_settings_table(self):
+        """
+        (Re)builds the settings side server list from self.servers
+        """
+        self.server_list_settings.removeRows(0, self.server_list_settings.rowCount())
+        self.settings_rows = {}
+
+        # Group counts and the parent index get rebuilt by add_settings_row()
+        self.groups = {}
+        self.child_servers = {}
+        self.group_rows = {}
+        self.group_list.removeRows(0, self.group_list.rowCount())
+
+        with self.views_frozen():
             for server in self.servers:
-                self.logger.debug("Server loaded:\n\t"
-                                  f"- {server} | {self.servers[server]}")
+                self.server_logger.debug("Server loaded:\n\t- %s | %s", server, self.servers[server])
+
+                self.add_settings_row(server)
+
+    def add_settings_row(self, name):
+        """
+        Adds a server from self.servers to the settings table, the search index and its group
+        :param name: str
+        """
+        server = self.servers[name]
+        name_item = QStandardItem(name)
+
+        self.server_list_settings.appendRow([
+            name_item,
+            QStandardItem(server['url']),
+            QStandardItem(str(server['port'])),
+            QStandardItem(Probes.PROBE_TYPES[Probes.probe_type(server)].title),
+            QStandardItem(ContentCheck.describe_check(server.get('check'))),
+            QStandardItem(server.get('group') or ""),
+            QStandardItem(server.get('parent') or ""),
+        ])
+        self.settings_rows[name] = name_item
+
+        if server.get('group'):
+            self.update_group(server['group'], servers=1, down=int(self.server_up.get(name) is False))
+        if server.get('parent'):
+            self.child_servers.setdefault(server['parent'], set()).add(name)
+
+        self.index_server(name)
+        if self.search_result is not None and name not in self.search_result:
+            self.settings_view.setRowHidden(name_item.row(), True)
+
+    def status_row(self, name):
+        """
+        :param name: str
+        :return: int - Row of the server in the status table, added if it has none yet
+        """
+        item = self.status_rows.get(name)
+        if item is not None:
+            return item.row()
+
+        item = QStandardItem(name)
+        self.server_list_status.appendRow([QStandardItem(), item])
+        self.status_rows[name] = item
+
+        row = item.row()
+        if self.search_result is not None and name not in self.search_result:
+            self.status_view.setRowHidden(row, True)
+        return row
+
+    def remove_server(self, name):
+        """
+        Removes a server from self.servers, both tables and everything kept about it
+        :param name: str
+        """
+        server = self.servers.pop(name)
+
+        item = self.settings_rows.pop(name, None)
+        if item is not None:
+            self.server_list_settings.removeRows(item.row(), 1)
+
+        if name not in self.status_rows:
+            self.server_logger.debug("No row found for %s on the status list", name)
+
+        if server.get('group'):
+            self.update_group(server['group'], servers=-1, down=-int(self.server_up.get(name) is False))
+        children = self.child_servers.get(server.get('parent'))
+        if children is not None:
+            children.discard(name)
+            if not children:
+                del self.child_servers[server['parent']]
+
+        self.forget_server(name)
+
+    def forget_server(self, name):
+        """
+        Drops everything kept per server (status row, search, timeouts, history, statistics, ...)
+        for a server that is no longer configured
+        Checks still queued for it skip it once they get their turn, see launch_probe()
+        :param name: str
+        """
+        item = self.status_rows.pop(name, None)
+        if item is not None:
+            self.server_list_status.removeRows(item.row(), 1)
+
+        self.search.remove(name)
+        if self.search_result is not None:
+            self.search_result.discard(name)
+
+        self.timeouts.forget(name)
+        self.history.forget(name)
+        self.sparkline.forget(name)
+        self.aggregates.pop(name, None)
+        self.latency_dirty.discard(name)
+        self.server_up.pop(name, None)
+        self.saved_status.pop(name, None)
+        self.last_responses.pop(name, None)
+
+        if self.push is not None:
+            self.push.remove(name)
+
+    def read_servers_file(self, filename):
+        """
+        Called from the file watcher thread when the server file changed on disk
+        Does the disk I/O and unpickling off the GUI thread, then hands the result over
+        :param filename: str
+        """
+        try:
+            with open(filename, 'rb') as handle:
+                servers = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            self.logger.warning("Unable to reload server list, keeping current list - %s", e)
+            return
 
-                self.server_list_settings.appendRow([
-                    QStandardItem(server),
-                    QStandardItem(self.servers[server]['url']),
-                    QStandardItem(str(self.servers[server]['port'])),
-                    QStandardItem(str(self.servers[server]['web'])),
-                ])
+        if isinstance(servers, dict):
+            self.servers_reloaded.emit(servers)
 
+    def apply_servers(self, servers):
+        """
+        Replaces the current server list with a freshly loaded one
+        The status table gets rebuilt on the next connection check
+        :param servers: dict - Same format as self.servers
+        """
+        self.logger.info("Server list reloaded from disk, %d servers", len(servers))
+
+        # Drop everything kept about servers that no longer exist, the rest get overwritten next check
+        removed = (self.servers.keys() | self.status_rows.keys()) - servers.keys()
+        with self.views_frozen():
+            for name in removed:
+                self.forget_server(name)
+
+        self.servers = servers
+        self.fill_settings_table()
+        self.apply_search(self.search_query, force=True)
+
+        self.status_bar.showMessage(f"Server list reloaded, {len(servers)} servers")
+
+    def apply_config(self, changed):
+        """
+        Applies config values that were changed on disk while the tool is running
+        :param changed: set - (section, value_name) keys that got a new value
+        """
+        if ("DEFAULT", "interval_checks") in changed:
+            interval = self.config.get_value("interval_checks", return_type=int)
+            if interval is not None:
+                self.interval = interval
+                self.findChild(QLineEdit, "interval_text").setText(str(self.interval))
+                self.status_bar.showMessage(f"Interval reloaded, new interval {self.interval} seconds")
+
+        if changed & {("DEFAULT", "timeout_min"), ("DEFAULT", "timeout_max"), ("DEFAULT", "timeout_factor")}:
+            minimum, maximum, factor = self.get_timeout_settings()
+            self.timeouts.minimum = minimum
+            self.timeouts.maximum = maximum
+            self.timeouts.factor = factor
+            self.timeouts.timeouts.clear()
+
+        if ("DEFAULT", "retry_on_timeout") in changed:
+            self.retry_on_timeout = self.config.get_value("retry_on_timeout", return_type=bool, fallback=True)
+
+        if ("DEFAULT", "content_max_bytes") in changed:
+            self.content_max_bytes = self.config.get_value("content_max_bytes", return_type=int,
+                                                           fallback=const.CONTENT_MAX_BYTES)
+
+        if ("DEFAULT", "parent_down_check_every") in changed:
+            self.parent_down_check_every = self.config.get_value("parent_down_check_every", return_type=int,
+                                                                 fallback=const.PARENT_DOWN_CHECK_EVERY)
+
+        if changed & {("DEFAULT", "max_per_host"), ("DEFAULT", "connection_rate"),
+                       ("DEFAULT", "connection_burst")}:
+            max_per_host, rate, burst = self.get_scheduler_settings()
+            self.scheduler.max_per_host = max_per_host
+            self.scheduler.bucket = Scheduler.TokenBucket(rate, burst)
+            # Raised limits, let waiting checks go
+            self.scheduler.pump()
+
+        if ("DEFAULT", "push_api_port") in changed:
+            self.start_push_api(self.config.get_value("push_api_port", return_type=int,
+                                                      fallback=const.PUSH_API_PORT))
+
+        if ("DEFAULT", "notify_status_change") in changed:
+            notify = self.config.get_value("notify_status_change", return_type=bool)
+            if notify is not None:
+                # Goes through notify_changed() to update self.notify
+                self.findChild(QCheckBox, "notify_check").setChecked(notify)
+
+    def load_snapshot(self):
+        """
+        Fills the status table with the results saved on the last exit
+        The first check simply overwrites them
+        Statuses are marked stale (greyed out) until they get refreshed
+        """
+        try:
+            with open(self.path(const.SNAPSHOT_FILE), 'rb') as handle:
+                snapshot = pickle.load(handle)
         except FileNotFoundError:
-            pass
+            return
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            self.logger.warning("Unable to read results snapshot, skipping - %s", e)
+            return
+
+        taken = time.strftime("%d/%m/%Y - %H:%M:%S", time.localtime(snapshot['time']))
+        stale_brush = QBrush(QColor("gray"))
+
+        # Older snapshots don't have statistics, or a history in the current format
+        self.history.restore(snapshot.get('history', {}))
+        self.aggregates.update(snapshot.get('aggregates', {}))
+
+        for server in self.servers:
+            response = snapshot['responses'].get(server)
+            if response is None:
+                continue
+
+            row = self.status_row(server)
+
+            status = QStandardItem(f"{response['status']} (stale)")
+            status.setToolTip(f"Last checked: {taken}")
+
+            items = {0: status,
+                     2: QStandardItem(response['ipv4/6']),
+                     3: QStandardItem(response['url']),
+                     4: QStandardItem(str(response['port']))}
+
+            for col, item in items.items():
+                item.setForeground(stale_brush)
+                self.server_list_status.setItem(row, col, item)
+            self.status_rows[server].setForeground(stale_brush)
+            self.server_list_status.setItem(row, 5, self.history_item(server))
+            self.update_statistics(row, server)
+
+            # So notifications work before the first check
+            self.saved_status[server] = response['status']
+            self.last_responses[server] = response
+            self.set_server_up(server, response.get('up'))
+            self.index_server(server)
+
+        self.logger.debug("Loaded results snapshot from %s", taken)
+
+    def save_snapshot(self):
+        """
+        Saves the last known result of every server, for load_snapshot() on the next launch
+        """
+        snapshot = {
+            'time': time.time(),
+            'responses': {name: response for name, response in self.last_responses.items()
+                          if name in self.servers},
+            'history': {name: series for name, series in self.history.series.items()
+                        if name in self.servers},
+            'aggregates': {name: aggregates for name, aggregates in self.aggregates.items()
+                           if name in self.servers}
+        }
+
+        try:
+            ConfigHandler.atomic_write(self.path(const.SNAPSHOT_FILE),
+                                       pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL),
+                                       mode='wb')
+        except Exception as e:
+            self.logger.error("Exception caught writing results snapshot", exc_info=e)
+
+    @staticmethod
+    def history_item(server_name):
+        """
+        Cell for the history column, the SparklineDelegate finds the server through Qt.UserRole
+        Setting a new item also tells the view to redraw it
+        :param server_name: str
+        :return: QStandardItem
+        """
+        item = QStandardItem()
+        item.setData(server_name, Qt.UserRole)
+        return item
+
+    def update_statistics(self, row, server_name):
+        """
+        Writes the uptime columns of a row in the status table, O(1)
+        The latency percentiles column follows with the next refresh_latencies()
+        :param row: int
+        :param server_name: str
+        """
+        aggregates = self.aggregates.get(server_name)
+        if aggregates is None:
+            return
+
+        uptimes = aggregates.uptimes(time.time())
+        col = 6
+        for title, _, _ in Aggregates.WINDOWS:
+            self.server_list_status.setItem(row, col, QStandardItem(Aggregates.format_uptime(uptimes[title])))
+            col += 1
+
+        if not self.latency_dirty:
+            QTimer.singleShot(int(const.LATENCY_REFRESH * 1000), self.refresh_latencies)
+        self.latency_dirty.add(server_name)
+
+    def refresh_latencies(self):
+        """
+        Redraws the latency percentiles column of every server that got results since the last time
+        """
+        now = time.time()
+        col = 6 + len(Aggregates.WINDOWS)
+        for server_name in self.latency_dirty:
+            aggregates = self.aggregates.get(server_name)
+            item = self.status_rows.get(server_name)
+            if aggregates is None or item is None:
+                continue
+            self.server_list_status.setItem(item.row(), col, QStandardItem(
+                Aggregates.format_latencies(aggregates.latency(const.LATENCY_WINDOW, now))))
+        self.latency_dirty.clear()
+
+    def export_statistics(self, filename):
+        """
+        Writes the uptime and latency percentiles of every server, per window, to a csv file
+        :param filename: str
+        """
+        now = time.time()
+        header = ["name", "url", "port", "window", "checks", "uptime"] + \
+                 [f"p{p}_ms" for p in const.LATENCY_PERCENTILES]
+
+        with open(filename, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+
+            for name, aggregates in self.aggregates.items():
+                if name not in self.servers:
+                    continue
+                for title, stats in aggregates.summary(now).items():
+                    writer.writerow(
+                        [name, self.servers[name]['url'], self.servers[name]['port'], title, stats['checks'],
+                         "" if stats['uptime'] is None else f"{stats['uptime']:.3f}"] +
+                        ["" if latency is None else f"{latency * 1000:.1f}" for latency in stats['latency']])
+
+    def get_timeout_settings(self):
+        """
+        :return: tuple - (min, max, factor) for the adaptive timeouts, from the config
+        """
+        return (self.config.get_value("timeout_min", return_type=float, fallback=const.MIN_TIMEOUT),
+                self.config.get_value("timeout_max", return_type=float, fallback=const.MAX_TIMEOUT),
+                self.config.get_value("timeout_factor", return_type=float, fallback=const.TIMEOUT_FACTOR))
+
+    def path(self, filename):
+        """
+        :param filename: str - one of the file constants, e.g. const.SERVER_FILE
+        :return: str - full path of that file in self.dir, with the separators of this OS
+        """
+        return ConfigHandler.local_path(self.dir, filename)
+
+    def get_scheduler_settings(self):
+        """
+        :return: tuple - (max per host, rate, burst) for the check scheduler, from the config
+        """
+        return (self.config.get_value("max_per_host", return_type=int, fallback=const.MAX_PER_HOST),
+                self.config.get_value("connection_rate", return_type=float, fallback=const.CONNECTION_RATE),
+                self.config.get_value("connection_burst", return_type=int, fallback=const.CONNECTION_BURST))
 
     def save(self):
 
-        # Save server list
-        with open(self.dir + "\\config\\servers.pickle", 'wb') as handle:
-            pickle.dump(self.servers, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        # Save server list, atomic so the file watcher (or a crash) never sees half a file
+        ConfigHandler.atomic_write(self.path(const.SERVER_FILE),
+                                   pickle.dumps(self.servers, protocol=pickle.HIGHEST_PROTOCOL),
+                                   mode='wb')
+        self.config.watcher.touch(self.path(const.SERVER_FILE))
 
         # Save window settings
         width = self.frameGeometry().width()
@@ -452,6 +1004,150 @@ class ConnectionTool(QMainWindow):
 
         self.config.update_section("WINDOW", values)
 
+    def startup_finished(self):
+        """
+        First pass through the event loop, the window is up and showing the snapshot
+        Reports how long that took, then starts the first check right away
+        instead of waiting a full interval
+        """
+        startup_ms = (time.perf_counter() - self.start_time) * 1000
+        self.logger.info("Startup took %.0fms", startup_ms)
+        self.status_bar.showMessage(f"Started in {startup_ms:.0f}ms")
+
+        self.refresh_servers()
+
+    """
+        = Search & groups =
+    """
+
+    def index_server(self, name):
+        """
+        (Re)indexes a server for the search, then shows/hides its rows if a search is active
+        :param name: str
+        """
+        server = self.servers.get(name)
+        if server is None:
+            return
+
+        self.search.update(name, server['url'], server['port'], server.get('group') or "",
+                           self.last_responses.get(name, {}).get('status', ""))
+
+        if self.search_result is None:
+            return
+
+        # Status changed, it might (not) match the current search anymore
+        matches = self.search.matches(name, self.search_query)
+        if matches != (name in self.search_result):
+            if matches:
+                self.search_result.add(name)
+            else:
+                self.search_result.discard(name)
+            self.set_server_hidden(name, not matches)
+
+    def apply_search(self, query, force=False):
+        """
+        Filters both server lists, only rows that change visibility get touched
+        :param query: str
+        :param force: bool - Re-apply to every row, after the tables got rebuilt
+        """
+        old = None if force else self.search_result
+        new = self.search.search(query)
+        # search() hands out its cache, keep our own copy
+        new = None if new is None else set(new)
+
+        if old is None and new is None and not force:
+            self.search_query = query
+            return
+
+        everything = self.servers.keys()
+        if force:
+            to_hide = set() if new is None else everything - new
+            to_show = everything if new is None else new
+        elif old is None:
+            to_hide, to_show = everything - new, set()
+        elif new is None:
+            to_hide, to_show = set(), everything - old
+        else:
+            to_hide, to_show = old - new, new - old
+
+        with self.views_frozen():
+            for name in to_hide:
+                self.set_server_hidden(name, True)
+            for name in to_show:
+                self.set_server_hidden(name, False)
+
+        self.search_query = query
+        self.search_result = new
+        if new is not None:
+            self.status_bar.showMessage(f"{len(new)}/{len(self.servers)} servers match")
+
+    @contextmanager
+    def views_frozen(self):
+        """
+        For a batch of row changes (hiding, adding, removing) on both tables
+        The views skip their per-row repaints and layout, they redraw once at the end
+        """
+        frozen = [view for view in (self.settings_view, self.status_view)
+                  if view is not None and view.updatesEnabled()]
+        for view in frozen:
+            view.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            for view in frozen:
+                view.setUpdatesEnabled(True)
+
+    def set_server_hidden(self, name, hidden):
+        item = self.settings_rows.get(name)
+        if item is not None:
+            self.settings_view.setRowHidden(item.row(), hidden)
+        item = self.status_rows.get(name)
+        if item is not None:
+            self.status_view.setRowHidden(item.row(), hidden)
+
+    def set_server_up(self, name, up):
+        """
+        Stores the up/down state of a server, updates its group rollup if the state changed
+        :param name: str
+        :param up: bool or None (unknown)
+        """
+        old_down = self.server_up.get(name) is False
+        self.server_up[name] = up
+        new_down = up is False
+
+        group = self.servers.get(name, {}).get('group')
+        if group and old_down != new_down:
+            self.update_group(group, down=1 if new_down else -1)
+
+    def update_group(self, group, servers=0, down=0):
+        """
+        Adjusts the counters of a group rollup and its row in the group table
+        :param group: str
+        :param servers: int - Change in the number of servers
+        :param down: int - Change in the number of down servers
+        """
+        counts = self.groups.setdefault(group, [0, 0])
+        counts[0] += servers
+        counts[1] += down
+
+        items = self.group_rows.get(group)
+        if counts[0] <= 0:
+            # Group is empty, drop it
+            self.groups.pop(group)
+            if items is not None:
+                self.group_list.removeRows(self.group_rows.pop(group)[0].row(), 1)
+            return
+
+        text = f"{counts[1]}/{counts[0]} down"
+        if items is None:
+            items = [QStandardItem(group), QStandardItem(text)]
+            self.group_list.appendRow(items)
+            self.group_rows[group] = items
+        else:
+            items[1].setText(text)
+
+        items[1].setForeground(QBrush(QColor("red")) if counts[1] else QBrush())
+
     """
         = Value type handling =
     """
@@ -467,7 +1163,7 @@ class ConnectionTool(QMainWindow):
             val = int(val)
             return True, val
         except ValueError:
-            self.logger.debug(f"Value error converting {val}")
+            self.logger.debug("Value error converting %s", val)
             if not hide_error:
                 self.error_message(f"Failed to convert value to int '{val}'", "ValueError")
             return False, val
@@ -487,7 +1183,7 @@ class ConnectionTool(QMainWindow):
             else:
                 raise ValueError
         except ValueError:
-            self.logger.debug(f"Value error converting {val}")
+            self.logger.debug("Value error converting %s", val)
             self.error_message(f"Failed to convert value to int '{val}'", "ValueError")
 
     """
@@ -504,7 +1200,7 @@ class ConnectionTool(QMainWindow):
 
         box.setIcon(QMessageBox.Critical)
         box.setWindowTitle(error_name)
-        box.setWindowIcon(QIcon(self.dir + const.WINDOW_ICON))
+        box.setWindowIcon(QIcon(self.path(const.WINDOW_ICON)))
         box.setText(msg)
 
         box.exec_()
@@ -523,53 +1219,238 @@ class ConnectionTool(QMainWindow):
         The old workers get cleaned up, be aware of possible memleak?
         :return:
         """
-        row = 0
+        # Replay/benchmark feed the results, suppressed ones included
+        if not self.probing:
+            return
+
+        self.sweep_count += 1
+
+        # Servers checking the exact same thing share a single check
+        # {probe key: [name, ...]}
+        plan = {}
+
         for server in self.servers:
-            worker = ConnectionChecker.ConnectionWorker(
-                    server,
-                    self.servers[server]['url'],
-                    self.servers[server]['port'],
-                    self.servers[server]['web']
-            )
+            # Parent is down, this one would only time out. Check it every so often (if at all)
+            down_parent = self.down_parent(server)
+            if down_parent is not None and (self.parent_down_check_every <= 0
+                                            or self.sweep_count % self.parent_down_check_every != 0):
+                response = self.suppressed_response(server, down_parent)
+                if self.recorder is not None:
+                    self.recorder.record(response, [server])
+                self.server_response(response, server)
+                continue
+
+            plan.setdefault(self.probe_key(server), []).append(server)
+
+        for servers in plan.values():
+            self.start_check(servers)
+
+        if len(plan) < len(self.servers):
+            self.logger.debug("Checking %d servers with %d checks", len(self.servers), len(plan))
+
+    def probe_key(self, server):
+        """
+        Everything that decides what a check does, servers with the same key get the same result
+        :param server: str - name of the server
+        :return: tuple
+        """
+        settings = self.servers[server]
+        check = settings.get('check')
+        return (self.normalize_url(settings['url']), int(settings['port']), Probes.probe_type(settings),
+                (check['type'], check['value']) if check else None)
+
+    @staticmethod
+    def normalize_url(url):
+        """
+        Only the scheme and host are case insensitive, the path and query stay as written
+        "HTTP://Example.com/A?b=C" -> "http://example.com/A?b=C"
+        Not urlsplit(), most urls here come without a scheme ("example.com/health")
+        :param url: str
+        :return: str
+        """
+        url = url.strip()
+        scheme = ""
+        if "://" in url:
+            scheme, url = url.split("://", 1)
+            scheme = scheme.lower() + "://"
+        host, slash, rest = url.partition("/")
+        return scheme + host.lower() + slash + rest
+
+    def start_check(self, servers):
+        """
+        Queues a single check for one or more servers, the scheduler starts it (see launch_probe())
+        :param servers: list - names of the servers, all with the same probe_key()
+        """
+        if not self.probing:
+            return
+
+        # A check already queued or running for the same thing (or done, with its result
+        # still on the way), let these servers get that result too
+        probe_id = repr(self.probe_key(servers[0]))
+        running = self.workers.get(probe_id)
+        if running is not None:
+            running['servers'].extend(name for name in servers if name not in running['servers'])
+            return
+
+        # Keep track of the workers, the results go to the rows in self.status_rows
+        host = Scheduler.probe_host(self.servers[servers[0]]['url'])
+        self.workers[probe_id] = {
+            'worker': None,
+            'servers': list(servers),
+            'host': host
+        }
+
+        self.active_workers += 1
+
+        self.scheduler.submit(host, lambda: self.launch_probe(probe_id))
+
+    def launch_probe(self, probe_id):
+        """
+        Scheduler gave a queued check its turn, hand it to the executor of its probe type
+        :param probe_id: str - key into self.workers
+        """
+        probe = self.workers[probe_id]
+
+        # Servers deleted while the check was waiting
+        probe['servers'] = [name for name in probe['servers'] if name in self.servers]
+        if not probe['servers']:
+            del self.workers[probe_id]
+            self.active_workers -= 1
+            self.scheduler.release(probe['host'])
+            return
+
+        servers = probe['servers']
+        first = self.servers[servers[0]]
+
+        # Shared check, use the most patient timeout of the group
+        # A retry after a timeout keeps this slot and doesn't take another token
+        timeout = max(self.timeouts.timeout_for(name) for name in servers)
+        worker = Probes.Probe(
+                probe_id,
+                Probes.probe_type(first),
+                first['url'],
+                first['port'],
+                timeout=timeout,
+                retry_timeout=self.timeouts.retry_timeout(timeout) if self.retry_on_timeout else None,
+                content_check=first.get('check'),
+                max_bytes=self.content_max_bytes
+        )
+
+        probe['worker'] = worker
+        self.dispatcher.submit(worker)
+
+    def probe_response(self, response, probe_id):
+        """
+        Worker finished a check, hand the result to every server that shares it
+        :param response: dict
+        :param probe_id: str - key into self.workers
+        """
+        # Worker finished, -1 from active_workers
+        self.active_workers -= 1
 
-            worker.worker_response.connect(self.server_response)
+        probe = self.workers.pop(probe_id, None)
+        if probe is None:
+            return
 
-            worker.start()
+        # Frees the host's slot, the next queued check may start
+        self.scheduler.release(probe['host'])
 
-            # Keep track of what row is assigned to what worker
-            self.workers[server] = {
-                'worker': worker,
-                'row': row
-            }
+        if self.recorder is not None:
+            self.recorder.record(response, probe['servers'])
 
-            row += 1
+        for name in probe['servers']:
+            self.server_response(dict(response), name)
 
-            self.active_workers += 1
+    def down_parent(self, server):
+        """
+        Walks up the parent chain, servers that are suppressed themselves are skipped
+        so the root cause is found
+        :param server: str
+        :return: str or None - Name of the first parent (grandparent, ...) that is down
+        """
+        seen = {server}
+        parent = self.servers[server].get('parent')
+        while parent and parent in self.servers and parent not in seen:
+            if self.server_up.get(parent) is False:
+                return parent
+            seen.add(parent)
+            parent = self.servers[parent].get('parent')
+        return None
+
+    def suppressed_response(self, server, parent):
+        """
+        Stand-in result for a server that was not checked because its parent is down
+        :return: dict - same format as a worker response
+        """
+        return {"status": f"Unreachable via parent ({parent})",
+                "ipv4/6": "-",
+                "port": self.servers[server]['port'],
+                "url": self.servers[server]['url'],
+                "is_web": Probes.probe_type(self.servers[server]) == "http",
+                "type": Probes.probe_type(self.servers[server]),
+                "up": None,
+                "latency": None,
+                "suppressed": True
+                }
 
     def server_response(self, response, server_name):
         """
-        Worker thread emitted a response, get corresponding row for current worker
-        located in self.workers
+        A check finished for a server (see probe_response()), get corresponding row for the server
+        located in self.status_rows
         :param response: dict
         :param server_name: str
         :return:
         """
-        self.logger.debug(f"Got response from {server_name}\n"
-                          f"\t- Contents: {response}\n"
-                          f"\t- Assigned row: {self.workers[server_name]['row']}")
+        suppressed = response.get('suppressed', False)
+
+        # Server got deleted while its check was running
+        if server_name not in self.servers:
+            return
+
+        row = self.status_row(server_name)
+
+        # Formatted on the log writer's thread, if the record is kept at all
+        self.response_logger.debug("Got response from %s\n\t- Contents: %s\n\t- Assigned row: %d",
+                                   server_name, response, row)
 
-        row = self.workers[server_name]['row']
         self.server_list_status.setItem(row, 0, QStandardItem(response['status']))
-        self.server_list_status.setItem(row, 1, QStandardItem(server_name))
+        # Name column keeps its item (it tracks the row), only drop the stale colour
+        self.status_rows[server_name].setData(None, Qt.ForegroundRole)
         self.server_list_status.setItem(row, 2, QStandardItem(response['ipv4/6']))
         self.server_list_status.setItem(row, 3, QStandardItem(response['url']))
         self.server_list_status.setItem(row, 4, QStandardItem(str(response['port'])))
 
-        # Not displaying this, unsure if needed, user can see this on the settings side aswell
-        # self.server_list_status.setItem(row, 5, QStandardItem(response['is_web']))
+        # Not displaying is_web, unsure if needed, user can see this on the settings side aswell
+
+        # Only appends to the push API's queue, it does the rest on its own thread
+        if self.push is not None:
+            self.push.publish(server_name, response)
+
+        # Suppressed means unknown, it doesn't count for the history or statistics
+        if suppressed:
+            self.last_responses[server_name] = response
+            self.set_server_up(server_name, None)
+            self.index_server(server_name)
+            return
+
+        # Down checks are stored without a latency, drawn as a red mark
+        now = time.time()
+        latency = response.get('latency') if response.get('up') else None
+        self.history.record(server_name, now, latency)
+        self.server_list_status.setItem(row, 5, self.history_item(server_name))
+
+        # Uptime/latency statistics, O(1) to update
+        aggregates = self.aggregates.get(server_name)
+        if aggregates is None:
+            aggregates = self.aggregates[server_name] = Aggregates.ServerAggregates()
+        aggregates.record(now, latency, bool(response.get('up')))
+        self.update_statistics(row, server_name)
+
+        # A parent is down, it already notified about the root cause
+        down_parent = self.down_parent(server_name)
 
         # Check if notifications are enabled
-        if self.notify:
+        if self.notify and down_parent is None:
             # Try to get previous server status
             old_status = self.saved_status.get(server_name)
             # Compare with current server status
@@ -577,11 +1458,24 @@ class ConnectionTool(QMainWindow):
             if old_status != response['status'] and old_status is not None:
                 NotificationHandler.notification(old_status, response['status'], server_name)
                 
+        # Feed the adaptive timeout, only successful checks have a latency
+        self.timeouts.record(server_name, response.get('latency'))
+
         # Save server status
         self.saved_status[server_name] = response['status']
-
-        # Worker finished, -1 from active_workers
-        self.active_workers -= 1
+        self.last_responses[server_name] = response
+
+        # Group rollups and search index follow the new status
+        was_down = self.server_up.get(server_name) is False
+        self.set_server_up(server_name, response.get('up'))
+        self.index_server(server_name)
+
+        # Came back up, check whatever got suppressed because of it right away
+        if was_down and response.get('up'):
+            for child in self.child_servers.get(server_name, ()):
+                if (self.down_parent(child) is None
+                        and self.last_responses.get(child, {}).get('suppressed')):
+                    self.start_check([child])
         return
 
     """
@@ -591,9 +1485,8 @@ class ConnectionTool(QMainWindow):
     def server_delete_clicked(self):
         """
         Get all rows from the selected cells, get rid of any duplicate rows.
-        Pop the server from the self.servers
-        Ignore the server on the status list,
-        it will get overwritten next server check
+        Remove those servers from self.servers and both tables
+        Names are collected first, removing a row shifts the rows below it
         :return:
         """
 
@@ -607,29 +1500,14 @@ class ConnectionTool(QMainWindow):
         # Get rid of duplicated in rows
         rows = list(dict.fromkeys(rows))
 
-        self.logger.debug(f"selected: {selected}\n"
-                          f"\t- Rows: {rows}")
-
-        for row in rows:
-            # Get the name (key) to pop from self.servers
-            name = self.server_list_settings.item(row, 0).text()
-
-            # Pop the server from the server list
-            self.servers.pop(name)
+        self.logger.debug("Deleting %d selected rows: %s", len(rows), rows)
 
-            # Remove the row from the settings table
-            self.server_list_settings.removeRows(row, 1)
+        # Get the names (keys) to remove from self.servers
+        names = [self.server_list_settings.item(row, 0).text() for row in rows]
 
-            # See if the server is also in the status list
-            try:
-                row = self.workers[name]['row']
-
-                # Remove the row from the status table
-                self.server_list_status.removeRows(row, 1)
-            except KeyError as ke:
-                self.logger.debug(f"No row found for {name} on the status list")
-                # Not found on status list, ignore
-                pass
+        with self.views_frozen():
+            for name in names:
+                self.remove_server(name)
         return
 
     def server_refresh_clicked(self):
@@ -640,7 +1518,11 @@ class ConnectionTool(QMainWindow):
         name = self.findChild(QLineEdit, "server_form_name").text()
         url = self.findChild(QLineEdit, "server_form_url").text()
         port = self.findChild(QLineEdit, "server_form_port").text()
-        web = "True" if self.findChild(QCheckBox, "server_form_web").isChecked() else "False"
+        type_name = self.findChild(QComboBox, "server_form_type").currentData()
+        check_type = self.findChild(QComboBox, "server_form_check_type").currentText()
+        check_value = self.findChild(QLineEdit, "server_form_check_value").text()
+        group = self.findChild(QLineEdit, "server_form_group").text().strip()
+        parent = self.findChild(QLineEdit, "server_form_parent").text().strip()
 
         # The 2 variables made below are kept seperate
         # Because QStandardItem requires a string, not int or bool
@@ -648,25 +1530,40 @@ class ConnectionTool(QMainWindow):
 
         # Test if port is a valid int and make a new variable with the int version of the port
         success, _port = self.convert_to_int(port, hide_error=True)
-        # Make a bool version of the web variable
-        _web = self.convert_to_bool(web)
+        probe_type = Probes.PROBE_TYPES[type_name]
+
+        # Each probe type reads the url its own way
+        check = None
+        check_error = probe_type.validate(url)
+
+        # Optional content check, websites only
+        if check_type != "None":
+            check = {'type': check_type, 'value': check_value}
+            if not probe_type.content_checks:
+                check_error = f"Content checks don't work with {probe_type.title} checks"
+            else:
+                check_error = check_error or ContentCheck.validate_check(check)
+
+        # Optional parent, has to be an existing server
+        if parent and parent not in self.servers:
+            check_error = f"Parent '{parent}' is not a known server"
 
         exists = name in self.servers
 
-        self.logger.debug(f"424 - Attempting to add | Valid port: {success} | Server exists: {exists}")
+        self.logger.debug("424 - Attempting to add | Valid port: %s | Server exists: %s", success, exists)
 
         # If the port was a valid number and name not already registered in self.servers:
-        if success and not exists:
-            # Add new server to dictionary (using int and bool version of port and web)
-            self.servers[name] = {'url': url, 'port': _port, 'web': _web}
+        if success and not exists and check_error is None:
+            # Add new server to dictionary (using the int version of port)
+            # web is kept next to the type for server lists from before there were probe types
+            self.servers[name] = {'url': url, 'port': _port, 'type': type_name, 'web': type_name == "http",
+                                  'check': check, 'group': group, 'parent': parent}
 
             # Add new row to the server list on the left, ready for checks
-            self.server_list_settings.appendRow([
-                QStandardItem(name),
-                QStandardItem(url),
-                QStandardItem(port),
-                QStandardItem(web),
-            ])
+            self.add_settings_row(name)
+        elif check_error is not None:
+            # Content check can't be used, not adding this
+            self.error_message(f"Unable to add server!\n{check_error}", "Invalid server settings")
         elif exists:
             # Server name already in use, skip
             self.error_message("Server name already in use, they are required to be unique", "Name already in use")
@@ -675,6 +1572,13 @@ class ConnectionTool(QMainWindow):
             self.error_message("Unable to add server because of the invalid port!\nMust be a number!", "Invalid number")
             pass
 
+    def server_type_changed(self, index):
+        """
+        Picked a probe type in the add server form, fill in its usual port
+        """
+        type_name = self.findChild(QComboBox, "server_form_type").itemData(index)
+        self.findChild(QLineEdit, "server_form_port").setText(str(Probes.PROBE_TYPES[type_name].default_port))
+
     def interval_update_clicked(self):
         interval_obj = self.findChild(QLineEdit, "interval_text")
 
@@ -698,13 +1602,106 @@ class ConnectionTool(QMainWindow):
         """
         :param state: int -> is either: 0 if unchecked, 2 if checked
         """
-        self.logger.debug(f"Notify changed, new state: {state} | Type: {type(state)}")
+        self.logger.debug("Notify changed, new state: %s | Type: %s", state, type(state))
         self.notify = bool(state)   # 0 = False, 2 = True
 
+    def closeEvent(self, event):
+        """
+        Qt event, window is closing - write out anything still pending
+        """
+        self.save_snapshot()
+        self.config.close()
+        self.dispatcher.stop()
+        self.stop_recording()
+        self.stop_push_api()
+        super().closeEvent(event)
+
     """
         Menu bar - options
     """
 
+    def search_changed(self, text):
+        self.apply_search(text)
+
+    def group_clicked(self, index):
+        """
+        Clicked a group rollup, search for that group
+        """
+        group = index.sibling(index.row(), 0).data()
+        self.findChild(QLineEdit, "search_text").setText(group)
+
+    def export_statistics_clicked(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Export statistics", self.dir, "CSV files (*.csv)")
+        if not filename:
+            return
+
+        try:
+            self.export_statistics(filename)
+            self.status_bar.showMessage(f"Statistics exported to {filename}")
+        except OSError as e:
+            self.error_message(f"Unable to export statistics\n{e}", "Export failed")
+
+    def start_recording(self, filename):
+        """
+        Records every check result from now on, until stop_recording()
+        :param filename: str
+        """
+        self.stop_recording()
+        self.recorder = Replay.ResponseRecorder(filename, self.servers)
+        self.findChild(QAction, "record_results").setChecked(True)
+        self.status_bar.showMessage(f"Recording results to {filename}")
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+
+        self.recorder.close()
+        self.status_bar.showMessage(f"Recorded {self.recorder.count} results to {self.recorder.filename}")
+        self.recorder = None
+        self.findChild(QAction, "record_results").setChecked(False)
+
+    def start_push_api(self, port):
+        """
+        (Re)starts the push API on the given loopback port, 0 turns it off
+        Subscribers get a server's status from its next check on
+        :param port: int
+        """
+        self.stop_push_api()
+        if not port or port < 0:
+            return
+
+        try:
+            self.push = PushApi.PushServer(port, logger=logging.getLogger("tool.PushApi"))
+        except OSError as e:
+            self.logger.warning("Unable to start the push API on port %d - %s", port, e)
+            self.status_bar.showMessage(f"Unable to start the push API on port {port} - {e}")
+            return
+
+        self.status_bar.showMessage(f"Push API listening on http://{const.PUSH_HOST}:{self.push.port}")
+
+    def stop_push_api(self):
+        if self.push is None:
+            return
+
+        self.push.stop()
+        self.push = None
+
+    def record_results_clicked(self, checked):
+        if not checked:
+            self.stop_recording()
+            return
+
+        filename, _ = QFileDialog.getSaveFileName(self, "Record results", self.dir, "Replay files (*.replay)")
+        if not filename:
+            self.findChild(QAction, "record_results").setChecked(False)
+            return
+
+        try:
+            self.start_recording(filename)
+        except OSError as e:
+            self.findChild(QAction, "record_results").setChecked(False)
+            self.error_message(f"Unable to record results\n{e}", "Recording failed")
+
     def toggle_style(self):
         self.logger.debug("Custom style toggled")
 